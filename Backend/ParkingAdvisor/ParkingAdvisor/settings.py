@@ -37,7 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'launch_page',
+    'launch_page.apps.LaunchPageConfig',
     'home_page'
 ]
 
@@ -24,5 +24,6 @@ from ParkingAdvisor import settings
 urlpatterns = [
     path('', home_page_views.show, name = "home_page"),
     path('launch_page', launch_page_views.show, name = "launch_page"),
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', launch_page_views.tile, name = "tiles"),
     path('admin/', admin.site.urls),
 ]
\ No newline at end of file
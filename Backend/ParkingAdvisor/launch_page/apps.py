@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class LaunchPageConfig(AppConfig):
     name = 'launch_page'
+
+    def ready(self):
+        # Map the shared datasets before the workers are forked, so they
+        # share one copy and answer the first request at once
+        import static.Datasets.filter as fl
+        fl.open_shared()
@@ -1,15 +1,12 @@
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404, HttpResponseBadRequest
+from django.templatetags.static import static as static_url
 import json
-import geopandas as gpd
-import pandas as pd
 import static.Datasets.filter as fl
+import static.Datasets.tiles as tiles
+import static.Datasets.plots as plots
 import numpy as np
-import matplotlib.colors as colors
-import matplotlib.pyplot as plt
 import datetime
-import branca
-from static.Datasets.visual import color_bar
 
 
 from django.views.decorators.csrf import csrf_exempt
@@ -20,6 +17,32 @@ street_geojson = "static/Datasets/data/Streets_gis.json"
 
 
 
+def tile(request, layer, z, x, y):
+    """
+    Serve a vector tile of a street layer ('rate', 'occupancy' or 'recomm')
+    at the time given by ?time=YYYY-MM-DDTHH:MM (default: now). The
+    'recomm' layer needs the destination as ?lat=...&lon=...
+    """
+    if layer not in tiles.LAYERS:
+        raise Http404("Unknown layer")
+    if not tiles.valid_tile(z, x, y):
+        raise Http404("Unknown tile")
+    if ('lat' in request.GET) != ('lon' in request.GET):
+        return HttpResponseBadRequest("lat and lon must be given together")
+    try:
+        now = (datetime.datetime.fromisoformat(request.GET['time'])
+               if 'time' in request.GET else datetime.datetime.now())
+        dest = ((float(request.GET['lat']), float(request.GET['lon']))
+                if 'lat' in request.GET else None)
+        data = tiles.street_tile(layer, z, x, y, now, dest)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    response = HttpResponse(data, content_type="application/vnd.mapbox-vector-tile")
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+
 @csrf_exempt
 def show(request):
 
@@ -27,27 +50,45 @@ def show(request):
         data = json.loads(request.body.decode("utf8"))
         if "gis_lat" in data.keys():
             gis = (data['gis_lat'], data['gis_lon'])
-            gis_data = gpd.read_file(street_geojson)
             now = datetime.datetime.now()
-
-            df_recomm = fl.recomm_layer(gis, now,
+            # Only the best streets are requested
+            if "top_k" in data.keys():
+                gdf = fl.top_k_streets(gis, now, int(data['top_k']),
                         [0.3, 0.4, 0.3])
+                return HttpResponse(json.dumps({"gdf_json": gdf.to_json()}))
+
+            # Only the scores, for a browser which already has the geometry
+            if "compact" in data.keys():
+                if data['compact'] not in fl.PAYLOAD_FORMATS:
+                    return HttpResponseBadRequest("Unknown payload format, expected one of {}"
+                                                  .format(fl.PAYLOAD_FORMATS))
+                df_recomm = fl.cached_recomm_layer(gis, now,
+                        [0.3, 0.4, 0.3])
+                return HttpResponse(json.dumps(fl.layer_payload(df_recomm, ['RECOMM'],
+                                                                data['compact'])))
 
-
-
-            df_recomm = pd.merge(df_recomm, gis_data[['UNITDESC', 'geometry']], on='UNITDESC')
-            gdf = gpd.GeoDataFrame(df_recomm, crs={'init': 'epsg:4326'}, geometry='geometry')
-            # gdf.to_file("static/Datasets/data/Streets_filtered.json", driver="GeoJSON")
-            # print(json.loads(gdf.to_json()))
-            return HttpResponse(json.dumps({"gdf_json": gdf.to_json()}))
+            gdf_json = fl.recomm_geojson(gis, now,
+                        [0.3, 0.4, 0.3])
+            return HttpResponse(json.dumps({"gdf_json": gdf_json}))
+        elif "geometry" in data.keys():
+            # The street geometries never change, so the browser keeps them
+            response = HttpResponse(fl.geometry_payload(precision=6),
+                                    content_type="application/json")
+            response["Cache-Control"] = "public, max-age=86400"
+            return response
+        elif "search" in data.keys():
+            # Autocomplete of street and station names
+            return HttpResponse(json.dumps({"streets": fl.search_streets(data['search']),
+                                            "stations": fl.search_stations(data['search'])}))
         elif "street_name" in data.keys():
             unitdesc = data['street_name']
             street = fl.Street(street_name = unitdesc)
             df = street.get_rate()
-            fig = street.get_flow_plot()
-            fig.savefig("static/images/parkingfig/info.svg", bbox_inches='tight')
+            # Each street and flow data version has its own plot file
+            fig_name, _ = plots.flow_plot(street, cache_dir="static/images/parkingfig")
             return HttpResponse(json.dumps({"street": street.get_name(), "limit": street.get_limit(),
-                                        "tables": df.to_html(classes='data', index = False, header=False), "titles": str(df.columns.values)}))
+                                        "tables": df.to_html(classes='data', index = False, header=False), "titles": str(df.columns.values),
+                                        "fig": static_url("images/parkingfig/" + fig_name)}))
         else:
             evname = data['ev_name']
             ev_charger = fl.EStation(station_name = evname)
@@ -57,6 +98,10 @@ def show(request):
                                         "TESLA": ev_charger.TESLA, "level1": ev_charger.level1,
                                         "level2": ev_charger.level2, "dc": ev_charger.dc}))
     else:
+        # Only the page itself needs geopandas and folium
+        import geopandas as gpd
+        from static.Datasets.visual import color_bar
+
         mode = 3
         colormap = color_bar(mode)
         colorlist = []
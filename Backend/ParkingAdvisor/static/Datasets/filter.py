@@ -1,204 +1,421 @@
 """
 This module contains all methods to filter the data to visualization
-and calculation.
+and calculation. The occupancy, rate and EV station data are kept in
+`flows`, `rates` and `stations`, whose public names are served from here
+as well.
 """
 
-import pkg_resources
+import json
+import os
 from datetime import datetime
 
 import pandas as pd
-from scipy.interpolate import interp1d
 import numpy as np
-import geopandas as gpd
-import matplotlib.pyplot as plt
-from geopy.distance import geodesic
 
+from . import dataset, geodesy, store, streets, svgchart, wire
+from .cache import LayerCache
+from .flows import (INTERPOLATION_NUM, TIME_SLOTS, flow_file, flow_matrix, flow_slot,
+                    flow_streets)
+from .lazy import lazy_import
+from .lookup import name_index
+from .mvt import pixel_size
+# The dataset files and EV stations are served from here as well
+from .paths import DATA_PATH, EV_FILE, FLOW_FILE, FLOW_RAW, GIS_FILE, RATE_FILE
+from .rates import (rate_cube, rate_day_type, rate_key, rate_splits, rate_streets,
+                    rate_table, rate_values)
+from .stations import (EV_ZOOM, EStation, ev_clusters, ev_layer, search_stations,
+                       select_station)
+
+# Loaded on first use, so rate and flow requests never import them
+gpd = lazy_import('geopandas')
+shapely = lazy_import('shapely')
 
 PACKAGE_NAME = __name__
-DATA_PATH = pkg_resources.resource_filename(PACKAGE_NAME, 'data/')
+RECOMM_FACTOR = (0.3, 0.4, 0.3)
 
-RATE_FILE = DATA_PATH + 'Rate_limit.csv'
-_FLOW_RAW = DATA_PATH + 'Occupancy_per_hour.csv'
-FLOW_FILE = DATA_PATH + 'flow_all_streets.csv'
-GIS_FILE = DATA_PATH + 'Streets_gis.json'
-EV_FILE = DATA_PATH + 'EV Charger.json'
+# Map zooms of the simplified street levels; streets are drawn at full
+# resolution from FULL_ZOOM
+PYRAMID_ZOOMS = (10, 12, 14)
+FULL_ZOOM = 16
+# The levels keep the parts of multi-lines since their version 2
+_LEVEL_VERSION = 2
 
-_INTERPOLATION_NUM = 241
-RECOMM_FACTOR = (0.3, 0.4, 0.3)
 
-# Calculations processing on clean datasets
-def _model_flow(d_flow_hour):
-    '''
-    Smooth the occupancy profile by interpolation ('cubic') to fix the
-    missing data point issue and provide pretty profile graphs later
+def street_points(street_geojson=GIS_FILE):
+    """
+    Get the reference points (midpoint, centroid and bounding box) of all
+    streets. They are built once from the GeoJSON file and memory-mapped
+    from 'data/build/' afterwards, see `streets.build_points`.
 
-    :param d_flow_hour: The hourly flow data of certain street
-    :type d_flow_hour: dataframe
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-    :returns: Smoothed flow dataframe by interpolation
-    :rtype: dataframe
-    '''
-    # Cubic interpolation
-    f_flow = interp1d(
-        d_flow_hour['HOUR'], d_flow_hour['OCCUPANCY'], kind='cubic',
-        fill_value='extrapolate')
+    :returns: The reference points of each street
+    :rtype: numpy record array
+    """
+    return dataset.artifact(dataset.artifact_file(street_geojson, 'points'),
+                            [street_geojson],
+                            lambda: streets.build_points(street_geojson))
 
-    t_new = np.linspace(0, 24, num=_INTERPOLATION_NUM, endpoint=True)
-    flow = f_flow(t_new)
-    # Create smoothed flow DataFrame
-    d_flow = pd.DataFrame({'TIME': t_new, 'OCCUPANCY': flow})
-    d_flow.OCCUPANCY.loc[d_flow.OCCUPANCY < 0] = 0
 
-    return d_flow
+def _street_index(street_geojson):
+    """
+    Build the spatial index over the midpoints of all streets
 
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-def _create_smooth_flow_file(file_flow=_FLOW_RAW):
-    '''
-    Generates the parking utilities of all streets by interpolation
-    and save a .csv file
+    :returns: The KD-tree of street midpoints
+    :rtype: `streets.PointIndex`
+    """
+    points = street_points(street_geojson)
+    return streets.PointIndex(points['MID_LAT'], points['MID_LON'])
 
-    :param file_flow: The entire flow dataset file
-    :type file_flow: str
 
-    :returns: The entire flow dataset file
-    :rtype: dataframe
-    '''
+def street_geometry(street_geojson=GIS_FILE):
+    """
+    Get the line vertices of all streets as flat buffers, see
+    `streets.read_parts`. They are built once from the GeoJSON file and
+    memory-mapped from 'data/build/' afterwards.
 
-    df_flow = pd.read_csv(file_flow, index_col=0)
-    df_flow['UNITDESC'] = df_flow['UNITDESC'].astype('category')
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-    # Create an empty dataframe to store smoothed flow data
-    num = len(df_flow['UNITDESC'].cat.categories)
+    :returns: The vertex coordinates, the part offsets, the street offsets
+              and the multi-line flags
+    :rtype: tuple of array
+    """
+    return tuple(np.asarray(dataset.artifact(dataset.artifact_file(street_geojson, name),
+                                             [street_geojson],
+                                             lambda i=i: streets.read_parts(street_geojson)[i]))
+                 for i, name in enumerate(('coords', 'part_offsets', 'offsets', 'multi')))
 
-    data_time = pd.DataFrame(pd.np.empty((_INTERPOLATION_NUM * num, 2)) * pd.np.nan,
-                             columns=['TIME', 'OCCUPANCY'])
-    new_index = np.repeat(df_flow['UNITDESC'].cat.categories, _INTERPOLATION_NUM)
 
-    # Group by street name as index
-    idx_start = 0
-    for cat in df_flow['UNITDESC'].cat.categories:
-        d_street = df_flow.loc[df_flow['UNITDESC'] == cat]
-        d_smooth = _model_flow(d_street)
+def _street_sindex(street_geojson):
+    """
+    Build the R-tree over the line geometries of all streets
 
-        data_time.iloc[idx_start:(idx_start + _INTERPOLATION_NUM)].values[:] = d_smooth.values[:]
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-        idx_start += _INTERPOLATION_NUM
+    :returns: The spatial index of the street geometries
+    :rtype: GeoPandas spatial index
+    """
+    return dataset.load(street_geojson, _street_lines).sindex
 
-    # Save the smooth file in data folder
-    data_time['UNITDESC'] = new_index
-    data_time.to_csv(r'.\data\flow_all_streets.csv')
 
-    return data_time
+def _street_lines(street_geojson):
+    """
+    Get the line geometries of all streets, in the order of the file
 
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-def _loc_period(df_selected_day, hour):
+    :returns: The street lines
+    :rtype: GeoPandas geometry array
     """
-    Determine the given hour number in which time section
-    and get the corresponding rate.
-    NOTE
-        -----------time1--------time2--------time3----------time4(n)----------
-        |----SEC0----|----SEC1----|----SEC2---|-----SEC3-----|----SEC4----|
-                     |   --------------input---------------  |
+    return gpd.array.from_shapely(streets.build_lines(*street_geometry(street_geojson)),
+                                  crs='EPSG:4326')
+
 
-    :param df_selected_day: the rate info dataframe with columns [key timepoint (n), rate_list (n-1)] 
-                            for each section
-    :type df_selected_day: dataframe
+def _zoom_level(zoom):
+    """
+    Get the simplified level to draw the streets at a map zoom
 
-    :param hour: the number of datetime hour
-    :type hour: int
+    :param zoom: The map zoom (None: full resolution)
+    :type zoom: int
 
-    :returns: the rate for all streets at the given time
-    :rtype: dataframe
+    :returns: The zoom of the level (None: full resolution)
+    :rtype: int
     """
-    if 'SEC0' not in df_selected_day.columns:
-        # Get the key timepoint number
-        n_time = int(df_selected_day.shape[1] / 2)
-        # Insert the rate of free timezone
-        df_selected_day.insert(n_time + 1, 'SEC0', 0)
-        df_selected_day['LAST_SEC'] = 0
-    else:
-        # Have inserted the free time region columns
-        n_time = int(df_selected_day.shape[1] / 2) -1
-
-    # Fill NaN by np.inf
-    df_selected_day = df_selected_day.fillna(np.inf)
-
-    # Initial the streets and rate array
-    streets = np.array([])
-    rate = np.array([])
-
-    # Group by the timezone condition
-    group = df_selected_day.groupby(df_selected_day.columns[1: n_time + 1].values.tolist())
-    for key, value in dict(list(group)).items():
-
-        # Get the array of timepoints. (e.g. [8, 11, 17, 20])
-        # And substrate the given hour number (e.g. [0, 3, 9, 12] when hour=8)
-        sub = np.array(key)-hour
-
-        # Count the non-positive values, which refers ot the section num
-        # (e.g. sec = 1. So hour=8 in SEC1)
-        sec = (sub <= 0).sum()
-
-        temp1 = value['UNITDESC'].values
-        temp2 = value.iloc[:, n_time + sec + 1].values
-        streets = np.append(streets, temp1)
-        rate = np.append(rate, temp2)
-    df_rate = pd.DataFrame({'UNITDESC': streets, 'RATE': rate})
-    df_rate.replace(to_replace=np.inf, value=0, inplace=True)
-    df_rate.RATE.astype('float')
+    if zoom is None or zoom >= FULL_ZOOM:
+        return None
+    levels = [level for level in PYRAMID_ZOOMS if level <= zoom]
 
-    return df_rate
+    return levels[-1] if levels else PYRAMID_ZOOMS[0]
+
+
+def _build_level(street_geojson, level):
+    """
+    Simplify all streets for a level: vertices within half a pixel of the
+    line are dropped and the coordinates are rounded below that
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :param level: The zoom of the level
+    :type level: int
+
+    :returns: The vertex coordinates and the part offsets
+    :rtype: tuple of array
+    """
+    tolerance = pixel_size(level) / 2
+    decimals = int(np.ceil(-np.log10(tolerance))) + 1
+    coords, part_offsets, _, _ = street_geometry(street_geojson)
+
+    return streets.simplify_lines(coords, part_offsets, tolerance, decimals)
+
+
+def street_level(zoom, street_geojson=GIS_FILE):
+    """
+    Get the simplified lines of all streets to draw at a map zoom. Each
+    level is built once and memory-mapped from 'data/build/' afterwards.
+
+    :param zoom: The map zoom
+    :type zoom: int
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The vertex coordinates (n_vertex, 2) in (long, lat), the
+              part offsets, the street offsets and the multi-line flags as
+              in `street_geometry`, or None at full resolution
+    :rtype: tuple of array
+    """
+    level = _zoom_level(zoom)
+    if level is None:
+        return None
+
+    coords, part_offsets = (
+        dataset.artifact(dataset.artifact_file(street_geojson, '{}_z{}'.format(name, level),
+                                               _LEVEL_VERSION),
+                         [street_geojson], lambda i=i: _build_level(street_geojson, level)[i])
+        for i, name in enumerate(('lines', 'offsets')))
+
+    return (coords, part_offsets) + street_geometry(street_geojson)[2:]
+
+
+def open_shared(file_rate=RATE_FILE, file_time=FLOW_FILE, street_geojson=GIS_FILE):
+    """
+    Map the arrays behind all layers, street details and GeoJSON responses
+    ahead of serving requests (e.g. at worker startup). The arrays are
+    read-only memory maps of the files in 'data/build/', so all processes
+    share one copy through the OS page cache; the first process builds any
+    missing file.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
+    :returns: The number of bytes mapped
+    :rtype: int
+    """
+    file_time = flow_file(file_time)
+    arrays = [*rate_cube(file_rate), rate_splits(file_rate), rate_table(file_rate),
+              *flow_matrix(file_time), street_points(street_geojson),
+              street_rows(file_rate, file_time, street_geojson),
+              slot_layers(file_rate, file_time, street_geojson),
+              *street_geometry(street_geojson)]
+    arrays += [street_ids(path, file_reader)
+               for path, file_reader in ((file_rate, rate_streets), (file_time, flow_streets),
+                                         (street_geojson, _gis_streets))]
+    tables = [dataset.load(street_geojson, _street_fragments)[1],
+              street_dictionary(file_rate, file_time, street_geojson)]
+    for level in PYRAMID_ZOOMS:
+        arrays += street_level(level, street_geojson)[:2]
+        tables.append(dataset.load(street_geojson, _level_fragments, level=level))
+    arrays += [array for table in tables for array in (table.data, table.offsets)]
+
+    # The small per-process indexes over the shared arrays
+    name_index(file_rate, rate_streets, 'UNITDESC')
+    name_index(file_time, flow_streets, 'UNITDESC')
+    dataset.load(street_geojson, _street_index)
+    street_dtype()
+
+    return sum(np.asarray(array).nbytes for array in arrays)
+
+
+def build_store(files=(RATE_FILE, FLOW_RAW, FLOW_FILE, GIS_FILE, EV_FILE)):
+    """
+    Write the columnar copies of the datasets (see `store`), which are read
+    instead of the CSV and GeoJSON files from then on. This needs pyarrow.
+
+    :param files: The dataset files
+    :type files: list of str
+
+    :returns: The Parquet file of each dataset
+    :rtype: dict
+    """
+    return {source: store.convert(flow_file(source)) for source in files}
+
+
+def build_pyramid(street_geojson=GIS_FILE):
+    """
+    Build the simplified street levels of all zooms ahead of serving maps
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The number of vertices of each level
+    :rtype: dict
+    """
+    return {level: len(street_level(level, street_geojson)[0]) for level in PYRAMID_ZOOMS}
+
+
+def _level_lines(street_geojson, level):
+    """
+    Get the line geometries of all streets at a level
 
-def _calc_distance(target, line_coordinate):
+    :returns: The street lines
+    :rtype: GeoPandas geometry array
     """
-    Calculates the distance from a given location to a street line
-    (midpoint of linestring)
+    lines = streets.build_lines(*street_level(level, street_geojson))
+
+    return gpd.array.from_shapely(lines, crs=dataset.load(street_geojson, _street_lines).crs)
 
-    :param target: The given point coordinate (long, lat)
-    :type target: list
 
-    :param line_coordinate: The start and end points of a street linestring
-    :type street_geojson: list of two list
+def street_lines(street_geojson=GIS_FILE, zoom=None):
+    """
+    Get the line geometries of all streets, in the order of the file
 
-    :returns: The distance between target and street line
-    :rtype: float
-    """    
-    # Calculates the midpoint of the street line
-    m_point = ((line_coordinate[0][1] + line_coordinate[1][1])/2,
-               (line_coordinate[0][0] + line_coordinate[1][0])/2)
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
 
-    # Calculates the distance
-    distance = geodesic(target, m_point).miles
+    :param zoom: The map zoom to simplify the lines for (None: full resolution)
+    :type zoom: int
 
-    return distance
+    :returns: The street lines
+    :rtype: GeoPandas geometry array
+    """
+    level = _zoom_level(zoom)
+    if level is None:
+        return dataset.load(street_geojson, _street_lines)
 
+    return dataset.load(street_geojson, _level_lines, level=level)
 
 
-def distance_df(target_gis, street_geojson=GIS_FILE):
+def distance_df(target_gis, street_geojson=GIS_FILE, method='geodesic', radius=None):
     """
     Calculates the distance from a given location to all streets
     
-    :param target_gis: The given point coordinate (long, lat)
+    :param target_gis: The given point coordinate (lat, long)
     :type target_gis: list
 
     :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
     :type street_geojson: str
 
+    :param method: 'geodesic' (exact, ellipsoidal) or 'haversine' (fast,
+                   spherical), see `geodesy` for the error bounds
+    :type method: str
+
+    :param radius: Only keep the streets within the radius (mile), looked
+                   up by the spatial index. (None: all streets)
+    :type radius: float
+
     :returns: a dataframe of distance of a given point to all streets
     :rtype: dataframe
     """
-    
-    street_df = gpd.read_file(street_geojson)
-    street_df['DISTANCE'] = street_df.geometry.apply(lambda p: _calc_distance(target_gis, p.coords))
+    points = street_points(street_geojson)
+    rows = None
+    if radius is not None:
+        index = dataset.load(street_geojson, _street_index)
+        rows = index.within(target_gis, radius)
+        points = points[rows]
+
+    df_dist = pd.DataFrame({'UNITDESC': _street_column(street_geojson, _gis_streets, rows),
+                            'DISTANCE': geodesy.distance(target_gis, points['MID_LAT'],
+                                                         points['MID_LON'], method)})
+    if radius is not None:
+        df_dist = df_dist.loc[df_dist['DISTANCE'] <= radius].reset_index(drop=True)
+
+    return df_dist
+
+
+def streets_within(dest, radius_miles, street_geojson=GIS_FILE):
+    """
+    Find all streets within a radius of a given location
+
+    :param dest: The destination coordinates (lat, long)
+    :type dest: tuple-like
+
+    :param radius_miles: The radius (mile)
+    :type radius_miles: float
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: a dataframe of the streets and their distances, nearest first
+    :rtype: dataframe
+    """
+    df_dist = distance_df(dest, street_geojson, radius=radius_miles)
+
+    return df_dist.sort_values('DISTANCE', kind='mergesort').reset_index(drop=True)
+
+
+def nearest_streets(dest, k=10, street_geojson=GIS_FILE):
+    """
+    Find the k nearest streets of a given location
+
+    :param dest: The destination coordinates (lat, long)
+    :type dest: tuple-like
+
+    :param k: The number of streets
+    :type k: int
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: a dataframe of the k streets and their distances, nearest first
+    :rtype: dataframe
+    """
+    index = dataset.load(street_geojson, _street_index)
+    rows = index.nearest(dest, k)
+    points = street_points(street_geojson)[rows]
+
+    df_dist = pd.DataFrame({'UNITDESC': _street_column(street_geojson, _gis_streets, rows),
+                            'DISTANCE': geodesy.distance(dest, points['MID_LAT'],
+                                                         points['MID_LON'])})
+
+    return df_dist.sort_values('DISTANCE', kind='mergesort').head(k).reset_index(drop=True)
+
+
+def streets_in_bounds(bounds, street_geojson=GIS_FILE):
+    """
+    Find all streets whose line crosses a bounding box
+
+    :param bounds: The bounding box (min long, min lat, max long, max lat)
+    :type bounds: tuple-like
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: a dataframe of the streets with their geometry
+    :rtype: GeoPandas.DataFrame
+    """
+    sindex = dataset.load(street_geojson, _street_sindex)
+    positions = np.sort(sindex.query(shapely.box(*bounds), predicate='intersects'))
+
+    names = dataset.load(street_geojson, _street_fragments)[0]
+    lines = dataset.load(street_geojson, _street_lines)
+    return gpd.GeoDataFrame({'UNITDESC': names[positions]}, geometry=lines[positions],
+                            index=positions)
 
-    df_dist = street_df[['UNITDESC', 'DISTANCE']]
 
-    return df_dist    
+def search_streets(text, limit=10, file_rate=RATE_FILE):
+    """
+    Find the street names starting with a text, e.g. for autocomplete
+
+    :param text: The start of the street name, in any case or spacing
+    :type text: str
 
+    :param limit: The maximum number of names (None: all)
+    :type limit: int
 
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
 
-def select_street(street_name, df_entire):
+    :returns: The street names, in alphabetical order
+    :rtype: list of str
+    """
+    return name_index(file_rate, rate_streets, 'UNITDESC').prefix(text, limit)
+
+
+def select_street(street_name, df_entire, index=None):
     """
     Select a specific street info from entire dataframe
 
@@ -208,39 +425,63 @@ def select_street(street_name, df_entire):
     :param df_entire: The dataframe containing all streets
     :type df_entire: dataframe
 
+    :param index: The index of the names of `df_entire` (see `name_index`)
+                  to look the street up in constant time, matching the name
+                  in any case or spacing (None: compare every row)
+    :type index: `NameIndex`
+
     :returns: info of specific street name
     :rtype: dataframe
     """
+    if index is not None:
+        return df_entire.iloc[index.rows(street_name)]
 
     info = df_entire.loc[df_entire['UNITDESC'] == street_name]
     return info
 
 
-def plot_flow(df_smooth_flow):
+def plot_flow(df_smooth_flow, backend='matplotlib'):
     """
-    Plot the flow figure for a single street
+    Plot the flow figure for a single street. The figure is not registered
+    with pyplot, so it is freed once it is no longer used.
 
     :param df_smooth_flow: The smoothed flow data of a dingle street
     :type df_smooth_flow: dataframe
 
+    :param backend: 'matplotlib' (a figure, e.g. for notebooks) or 'svg'
+                    (the same chart as SVG text, drawn without matplotlib,
+                    see `svgchart.flow_svg`)
+    :type backend: str
+
     :returns: a figure containing the info of a dataframe
-    :rtype: matplotlib.pyplot.Figure
+    :rtype: matplotlib.figure.Figure or str
     """
     time = df_smooth_flow['TIME']
     flow = df_smooth_flow['OCCUPANCY']
 
-    fig = plt.figure(figsize=(4, 2.5), frameon=False, facecolor=None)
-    plt.fill_between(time, flow, alpha=0.5, edgecolor='#1B5C99',
-                     facecolor='#84B5D1', lw=2)
+    if backend == 'svg':
+        return svgchart.flow_svg(time.values, flow.values)
+    if backend != 'matplotlib':
+        raise ValueError("Unknown plot backend '{}', expected 'matplotlib' or 'svg'".format(backend))
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(4, 2.5), frameon=False, facecolor=None)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.fill_between(time, flow, alpha=0.5, edgecolor='#1B5C99',
+                    facecolor='#84B5D1', lw=2)
 
     # Change tick labels
-    plt.xticks([8, 12, 16, 20, 24], ['8 AM', '12 PM', '4 PM', '8 PM', '12 AM'])
-    plt.yticks([0, 0.5, 1], ['0', '50', '100 %'])
+    ax.set_xticks([8, 12, 16, 20, 24])
+    ax.set_xticklabels(['8 AM', '12 PM', '4 PM', '8 PM', '12 AM'])
+    ax.set_yticks([0, 0.5, 1])
+    ax.set_yticklabels(['0', '50', '100 %'])
     # Set axis limit
-    plt.xlim([8, 24])
-    plt.ylim([0, 1])
+    ax.set_xlim([8, 24])
+    ax.set_ylim([0, 1])
     # Delete y axis
-    ax = plt.gca()
     ax.spines['right'].set_visible(False)
     ax.spines['top'].set_visible(False)
     ax.spines['left'].set_visible(False)
@@ -250,7 +491,7 @@ def plot_flow(df_smooth_flow):
     ax.tick_params(axis='x', pad=8)
     ax.xaxis.set_ticks_position('bottom')
     # Show girds
-    plt.grid(color='dimgrey', alpha=0.5)
+    ax.grid(color='dimgrey', alpha=0.5)
 
     return fig
 
@@ -266,23 +507,47 @@ class Street():
     plot:   Occupancy over time figure
     rate:   Parking rate table
     limit:  Parking limit (in hour)
+
+    NOTE
+        A street only keeps the positions of its rows in the shared
+        datasets. The rate table, the limit and the figure are computed on
+        first use and kept by the instance.
     """
 
+    __slots__ = ('name', '_rate_rows', '_flow_rows', '_rate', '_limit', '_plot')
+
     def __init__(self, street_name):
         """
         :param street_name: The given street name
         :type street_name: str
         """
-        self.name = street_name
+        rate_index = name_index(RATE_FILE, rate_streets, 'UNITDESC')
+        self.name = rate_index.name(street_name) or street_name
+        self._rate_rows = rate_index.rows(self.name)
+        self._flow_rows = name_index(flow_file(FLOW_FILE), flow_streets,
+                                     'UNITDESC').rows(self.name)
+
+        self._rate = None
+        self._limit = None
+        self._plot = None
+
+    @property
+    def rate(self):
+        return self.get_rate()
+
+    @property
+    def limit(self):
+        return self.get_limit()
 
-        df_flow = pd.read_csv(FLOW_FILE, index_col=0)
-        self._flow_df = select_street(self.name, df_flow)
+    @property
+    def plot(self):
+        return self.get_flow_plot()
 
-        df_rate = pd.read_csv(RATE_FILE, index_col=0).fillna(0)
-        self._rate_df = select_street(self.name, df_rate)
-        self.rate = pd.DataFrame(columns=['DAYS', 'SEC1', 'SEC2', 'SEC3'])
-        
-        self.limit = 0
+    def _rate_record(self):
+        "The rates and key timepoints of the street, missing values as 0"
+        record = np.nan_to_num(rate_table(RATE_FILE)[self._rate_rows[0]])
+
+        return [self.name] + record.tolist()
 
     def get_name(self):
         "Street name"
@@ -290,9 +555,13 @@ class Street():
 
     def get_rate(self):
         "Get rate table"
-        time_points = [int(self._rate_df.values[0][i]) for i in [2, 3, 5, 6, 8, 9,
-                                           11, 12, 14, 15, 17, 18]]
-        rate = [self._rate_df.values[0][i] for i in [1, 4, 7, 10, 13, 16]]
+        if self._rate is not None:
+            return self._rate
+
+        record = self._rate_record()
+        time_points = [int(record[i]) for i in [2, 3, 5, 6, 8, 9,
+                                                11, 12, 14, 15, 17, 18]]
+        rate = [record[i] for i in [1, 4, 7, 10, 13, 16]]
         # Create a list to store key timepoint in `str` and 12-hour clock
         timepoint_text = []
         for hour in time_points:
@@ -302,24 +571,30 @@ class Street():
             else:
                 hour_new = datetime.strptime(str(hour), '%H').strftime("%I %p").lstrip('0')
             timepoint_text.append(hour_new)
-        self.rate['DAYS'] = ['','WKD','SAT']
 
         time_label = [timepoint_text[2 * i]+'-'+ timepoint_text[2 * i + 1] for i in range(6)]
-        self.rate.iloc[0, 1:].values[:] = time_label[:3]        
-        self.rate.iloc[1, 1:].values[:] = rate[:3]
-        self.rate.iloc[2, 1:].values[:] = rate[3:]
+        self._rate = pd.DataFrame([[''] + time_label[:3],
+                                   ['WKD'] + rate[:3],
+                                   ['SAT'] + rate[3:]],
+                                  columns=['DAYS', 'SEC1', 'SEC2', 'SEC3'], dtype=object)
 
-        return self.rate
+        return self._rate
 
     def get_limit(self):
         "Get parking limit in hour"
-        self.limit = self._rate_df.iloc[0, -1]/60 # convert into hour
-        return self.limit
+        if self._limit is None:
+            self._limit = self._rate_record()[-1]/60 # convert into hour
+        return self._limit
 
-    def get_flow_plot(self):
-        "Get the flow analysis figure"
-        self.plot = plot_flow(self._flow_df)
-        return self.plot
+    def get_flow_plot(self, backend='matplotlib'):
+        "Get the flow analysis figure, see `plot_flow` for the backends"
+        if self._plot is None or self._plot[0] != backend:
+            matrix = flow_matrix(FLOW_FILE)[1]
+            occupancy = np.asarray(matrix[self._flow_rows[:1]], dtype=np.float64).ravel()
+            df_flow = pd.DataFrame({'TIME': TIME_SLOTS[:len(occupancy)],
+                                    'OCCUPANCY': occupancy})
+            self._plot = (backend, plot_flow(df_flow, backend))
+        return self._plot[1]
 
 
 # Folium map plot layers
@@ -338,18 +613,12 @@ def flow_layer(date_time, file_time=FLOW_FILE):
     :returns: A dataframe containing occupancy at the time point
     :rtype: dataframe
     """
-    # Round the time decimal to 1 digit
-
-    time_float = date_time.hour + date_time.minute/60.0
-    time_float = round(time_float, 1)
-
-    d_entire = pd.read_csv(file_time, index_col=0)
+    slot = flow_slot(date_time)
+    matrix = flow_matrix(file_time)[1]
 
-    # Change columns dtype to accelerate
-    for col in ['UNITDESC', 'TIME']:
-        d_entire[col] = d_entire[col].astype('category')
-
-    df_flow = d_entire.loc[np.isclose(d_entire[col], time_float)]
+    df_flow = pd.DataFrame({'TIME': TIME_SLOTS[slot],
+                            'OCCUPANCY': matrix[:, slot].astype(np.float64),
+                            'UNITDESC': _street_column(file_time, flow_streets)})
 
     return df_flow
 
@@ -368,30 +637,406 @@ def rate_layer(date_time, file_rate=RATE_FILE):
     :returns: a dataframe containing all the info of the layer
     :rtype: dataframe
     """
-    raw = pd.read_csv(file_rate)
-    raw.apply(pd.to_numeric, errors='ignore')
-
-    day = date_time.isoweekday()
-    hour = date_time.hour
-
-    # SUN - free
-    if day == 7:
-        df_rate = pd.DataFrame({'UNITDESC': raw.UNITDESC, 'RATE': 0})
-    # SAT
-    elif day == 6:
-        cols = ['UNITDESC', 'SAT_START1', 'SAT_END1', 'SAT_END2', 'SAT_END3',
-                'SAT_RATE1', 'SAT_RATE2', 'SAT_RATE3']
-        df_rate = _loc_period(raw.loc[:, cols], hour)
-    # WKD
-    else:
-        cols = ['UNITDESC', 'WKD_START1', 'WKD_END1', 'WKD_END2', 'WKD_END3',
-                'WKD_RATE1', 'WKD_RATE2', 'WKD_RATE3']
-        df_rate = _loc_period(raw.loc[:, cols], hour)
+    df_rate = pd.DataFrame({'UNITDESC': _street_column(file_rate, rate_streets),
+                            'RATE': rate_values(date_time, file_rate)})
 
     return df_rate
 
 
-def recomm_layer(dest, date_time, factor=RECOMM_FACTOR):
+def _build_street_dictionary(file_rate, file_time, street_geojson):
+    """
+    Collect the names of the streets of the rate, flow and GIS files
+
+    :returns: The distinct street names, in alphabetical order
+    :rtype: list of str
+    """
+    names = [rate_cube(file_rate)[0], flow_matrix(file_time)[0],
+             street_points(street_geojson)['UNITDESC']]
+
+    return np.unique(np.concatenate([np.asarray(part, dtype=str) for part in names])).tolist()
+
+
+def street_dictionary(file_rate=RATE_FILE, file_time=FLOW_FILE, street_geojson=GIS_FILE):
+    """
+    Get the canonical street dictionary: the names of all streets of the
+    rate, flow and GIS files, street i having the id i. It is built with
+    the datasets and memory-mapped from 'data/build/' afterwards. The
+    layers refer to the streets by id (see `street_ids`), so the names are
+    only materialized for output.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The street names, in alphabetical order
+    :rtype: `StringTable`
+    """
+    file_time = flow_file(file_time)
+    return dataset.string_artifact(
+        dataset.artifact_file(file_rate, 'street_dictionary'), [file_rate, file_time, street_geojson],
+        lambda: _build_street_dictionary(file_rate, file_time, street_geojson))
+
+
+def _street_dtype(file_rate, file_time, street_geojson):
+    """
+    Get the categorical type of the street names, whose categories are the
+    street dictionary, see `street_dictionary`
+
+    :returns: The type
+    :rtype: pandas.CategoricalDtype
+    """
+    return pd.CategoricalDtype(street_dictionary(file_rate, file_time, street_geojson).tolist())
+
+
+def street_dtype():
+    """
+    Get the categorical type of the interned street names: the codes of a
+    column of this type are the street ids
+
+    :returns: The type, shared by all layers of the process
+    :rtype: pandas.CategoricalDtype
+    """
+    return dataset.load(RATE_FILE, _street_dtype, file_time=FLOW_FILE, street_geojson=GIS_FILE)
+
+
+def _gis_streets(street_geojson):
+    """
+    Get the street names of the GIS file, see `street_points`
+
+    :returns: The street names
+    :rtype: dict
+    """
+    return {'UNITDESC': dataset.load(street_geojson, _street_fragments)[0]}
+
+
+def street_ids(path, file_reader):
+    """
+    Get the id of each street of a dataset in the street dictionary (see
+    `street_dictionary`). The ids are built with the dictionary and stored
+    next to the dataset in 'data/build/'.
+
+    :param path: The dataset file (e.g. RATE_FILE)
+    :type path: str
+
+    :param file_reader: The function reading the street names of the file,
+                        i.e. `rate_streets`, `flow_streets` or `_gis_streets`
+    :type file_reader: function
+
+    :returns: The id of each street, in the dataset order (-1: not in the
+              dictionary)
+    :rtype: int32 array
+    """
+    path = flow_file(path)
+    sources = [path] + [source for source in (RATE_FILE, flow_file(FLOW_FILE), GIS_FILE)
+                        if os.path.abspath(source) != os.path.abspath(path)]
+
+    return dataset.artifact(
+        dataset.artifact_file(path, 'street_ids'), sources,
+        lambda: street_dtype().categories.get_indexer(file_reader(path)['UNITDESC']).astype(np.int32))
+
+
+def _street_column(path, file_reader, rows=None):
+    """
+    Get the street names of rows of a dataset as a categorical column of
+    the street dictionary, which only holds the ids. The names of a file
+    with streets out of the dictionary are returned as strings.
+
+    :param path: The dataset file (e.g. RATE_FILE)
+    :type path: str
+
+    :param file_reader: The function reading the street names of the file,
+                        see `street_ids`
+    :type file_reader: function
+
+    :param rows: The positions of the rows (None: all)
+    :type rows: array of int
+
+    :returns: The street names
+    :rtype: pandas.Categorical (or array of str)
+    """
+    ids = np.asarray(street_ids(path, file_reader))
+    if (ids < 0).any():
+        names = np.asarray(file_reader(path)['UNITDESC'])
+        return names if rows is None else names[rows]
+
+    return pd.Categorical.from_codes(ids if rows is None else ids[rows], dtype=street_dtype())
+
+
+def _id_positions(ids, size):
+    """
+    Invert the street ids of a dataset, see `street_ids`
+
+    :param ids: The id of each street of the dataset
+    :type ids: array of int
+
+    :param size: The size of the street dictionary
+    :type size: int
+
+    :returns: The position of each id in the dataset (-1: missing), with
+              one more -1 at the end, so indexing with the id -1 gives -1
+    :rtype: int64 array
+    """
+    ids = np.asarray(ids)
+    known = ids >= 0
+    positions = np.full(size + 1, -1, dtype=np.int64)
+    positions[ids[known]] = np.flatnonzero(known)
+
+    return positions
+
+
+def _gis_rows(names, street_geojson):
+    """
+    Find the streets of a name column in the GIS file: by indexing with the
+    street ids if the names are interned (see `_street_column`), and by
+    looking up the names otherwise
+
+    :param names: The street names
+    :type names: pandas.Series
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The position of each street in the GIS file (-1: missing)
+    :rtype: int64 array
+    """
+    dtype = street_dtype()
+    if isinstance(names.dtype, pd.CategoricalDtype) and names.cat.categories is dtype.categories:
+        positions = _id_positions(street_ids(street_geojson, _gis_streets), len(dtype.categories))
+        return positions[names.cat.codes.values]
+
+    return dataset.load(street_geojson, _street_fragments)[0].get_indexer(names)
+
+
+def _build_street_rows(file_rate, file_time, street_geojson):
+    """
+    Align the streets of the rate, flow and GIS files, i.e. the rows of an
+    inner join of the three files on the street id, in the rate file order
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The position of each joined street in the rate cube, the flow
+              matrix and the street points (3 x n_street)
+    :rtype: int64 array
+    """
+    size = len(street_dtype().categories)
+    rate_ids = np.asarray(street_ids(file_rate, rate_streets))
+    rows = [np.arange(len(rate_ids))]
+    for path, file_reader in ((file_time, flow_streets), (street_geojson, _gis_streets)):
+        rows.append(_id_positions(street_ids(path, file_reader), size)[rate_ids])
+    rows = np.array(rows)
+
+    return rows[:, (rows >= 0).all(axis=0)]
+
+
+def street_rows(file_rate=RATE_FILE, file_time=FLOW_FILE, street_geojson=GIS_FILE):
+    """
+    Get the alignment of the streets of the rate, flow and GIS files, so
+    the layers can be combined by integer indexing instead of merging on
+    the street names. It is built once and memory-mapped from
+    'data/build/' afterwards.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The positions of the streets in the rate cube, the flow
+              matrix and the street points (3 x n_street)
+    :rtype: int64 array
+    """
+    file_time = flow_file(file_time)
+    return dataset.artifact(dataset.artifact_file(file_rate, 'street_rows'),
+                            [file_rate, file_time, street_geojson],
+                            lambda: _build_street_rows(file_rate, file_time, street_geojson))
+
+
+
+# The planes of the slot table: the rate of each day type, then the occupancy
+_OCCUPANCY_PLANE = 3
+_SLOTS_PER_HOUR = (INTERPOLATION_NUM - 1) // 24
+# A date of each rate day type: Weekday, Saturday, Sunday
+_DAY_TYPE_DATES = (datetime(2018, 12, 10), datetime(2018, 12, 15), datetime(2018, 12, 16))
+
+
+def _build_slot_layers(file_rate, file_time, street_geojson):
+    """
+    Evaluate the rate of every day type and the occupancy of the aligned
+    streets (see `street_rows`) at every time slot
+
+    :returns: The float32 table (4 x time slots x n_street)
+    :rtype: array
+    """
+    rate_rows, flow_rows, _ = np.asarray(street_rows(file_rate, file_time, street_geojson))
+
+    table = np.empty((_OCCUPANCY_PLANE + 1, INTERPOLATION_NUM, len(rate_rows)), dtype=np.float32)
+    for day_type, day in enumerate(_DAY_TYPE_DATES):
+        for slot in range(INTERPOLATION_NUM - 1):
+            date_time = day.replace(hour=slot // _SLOTS_PER_HOUR,
+                                    minute=slot % _SLOTS_PER_HOUR * 60 // _SLOTS_PER_HOUR)
+            table[day_type, slot] = rate_values(date_time, file_rate)[rate_rows]
+        # 24:00 ends the last slot of the day
+        table[day_type, -1] = table[day_type, -2]
+    table[_OCCUPANCY_PLANE] = np.asarray(flow_matrix(file_time)[1])[flow_rows].T
+
+    return table
+
+
+def slot_layers(file_rate=RATE_FILE, file_time=FLOW_FILE, street_geojson=GIS_FILE):
+    """
+    Get the rate and occupancy layers of the aligned streets (see
+    `street_rows`) at every time slot of 0.1 hour, so a layer at any time
+    is one row of the table. It is built once from the datasets and
+    memory-mapped from 'data/build/' afterwards.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The float32 table (4 x time slots x n_street): the rate of
+              the day type d at the slot i (time i/10 hour) is row [d, i],
+              0 -- Weekday, 1 -- Saturday, 2 -- Sunday, and the occupancy
+              at the slot i is row [3, i]
+    :rtype: array
+    """
+    file_time = flow_file(file_time)
+    return dataset.artifact(dataset.artifact_file(file_rate, 'slot_layers'),
+                            [file_rate, file_time, street_geojson],
+                            lambda: _build_slot_layers(file_rate, file_time, street_geojson))
+
+
+def slot_values(date_time, prop):
+    """
+    Look up the rate or occupancy of the aligned streets (see
+    `street_rows`) at a datetime in the slot table, see `slot_layers`
+
+    :param date_time: The start time of parking
+    :type date_time: `datatime`
+
+    :param prop: 'RATE' or 'OCCUPANCY'
+    :type prop: str
+
+    :returns: The property of each street
+    :rtype: float64 array
+    """
+    if prop == 'OCCUPANCY':
+        return slot_layers()[_OCCUPANCY_PLANE, flow_slot(date_time)].astype(np.float64)
+    if prop != 'RATE':
+        raise ValueError("Unknown layer '{}', expected 'RATE' or 'OCCUPANCY'".format(prop))
+
+    day_type, hour = rate_day_type(date_time), date_time.hour
+    slot, offset = divmod(date_time.minute * _SLOTS_PER_HOUR, 60)
+    if offset and rate_splits(RATE_FILE)[day_type, hour].any():
+        # A rate section may start between the slots
+        return rate_values(date_time)[np.asarray(street_rows())[0]]
+
+    return slot_layers()[day_type, hour * _SLOTS_PER_HOUR + slot].astype(np.float64)
+
+def _min_max(values):
+    """
+    Min-max normalize the columns of an array over the streets; a constant
+    column is set to 1
+
+    :param values: The values (n_street x n_column), or a stack of them
+                   (n_query x n_street x n_column)
+    :type values: array
+
+    :returns: The normalized values
+    :rtype: array
+    """
+    v_min = np.nanmin(values, axis=-2, keepdims=True)
+    v_range = np.nanmax(values, axis=-2, keepdims=True) - v_min
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(v_range > 0, (values - v_min) / v_range, 1.0)
+
+
+def recomm_scores(rate, flow, dist, factor=RECOMM_FACTOR):
+    """
+    Calculates the recommanded score of aligned streets. The rate, flow and
+    log distance are min-max normalized, weighted by `factor`, and the
+    weighted sum is normalized to 1 (best) -- 0 (worst). Stacked queries
+    (n_query x n_street) are scored separately.
+
+    :param rate, flow, dist: The rate, occupancy and distance (mile) of
+                             each street
+    :type rate, flow, dist: array
+
+    :param factor: The score factor to calculate recommanded score
+    :type factor: list
+
+    :returns: The normalized rate, occupancy and log distance of each
+              street (n_street x 3) and the recommanded scores
+    :rtype: tuple of array
+    """
+    with np.errstate(divide='ignore'):
+        values = np.stack(np.broadcast_arrays(rate, flow, np.log10(dist)), axis=-1)
+    if not values.shape[-2]:
+        return values, np.zeros(values.shape[:-1])
+
+    values = _min_max(values)
+    score = values @ np.asarray(factor, dtype=np.float64)
+    r_max = np.nanmax(score, axis=-1, keepdims=True)
+
+    return values, (r_max - score) / (r_max - np.nanmin(score, axis=-1, keepdims=True))
+
+
+def _recomm_arrays(dest, date_time, factor, radius, method):
+    """
+    Calculates the recommanded scores of the aligned streets, see
+    `recomm_layer`
+
+    :returns: The positions of the scored streets in the rate cube and the
+              street points, their normalized properties (n_street x 3)
+              and their scores
+    :rtype: tuple of array
+    """
+    # Get all properties, aligned on the streets of all three files. The
+    # memory-mapped artifacts are indexed as plain arrays
+    rate_rows, _, gis_rows = np.asarray(street_rows())
+    aligned = np.arange(len(rate_rows))
+    points = np.asarray(street_points())
+    if radius is not None:
+        near = np.zeros(len(points), dtype=bool)
+        near[dataset.load(GIS_FILE, _street_index).within(dest, radius)] = True
+        keep = near[gis_rows]
+        rate_rows, gis_rows, aligned = rate_rows[keep], gis_rows[keep], aligned[keep]
+
+    dist = geodesy.distance(dest, points['MID_LAT'][gis_rows], points['MID_LON'][gis_rows],
+                            method)
+    if radius is not None:
+        keep = dist <= radius
+        rate_rows, gis_rows, aligned, dist = (rate_rows[keep], gis_rows[keep],
+                                              aligned[keep], dist[keep])
+
+    # The destination-independent properties are looked up in the slot table
+    rate = slot_values(date_time, 'RATE')[aligned]
+    flow = slot_values(date_time, 'OCCUPANCY')[aligned]
+    values, score = recomm_scores(rate, flow, dist, factor)
+
+    return rate_rows, gis_rows, values, score
+
+
+def recomm_layer(dest, date_time, factor=RECOMM_FACTOR, radius=None, method='geodesic'):
     """
     Generates a dataframe with recommanded score for all streets
 
@@ -404,39 +1049,231 @@ def recomm_layer(dest, date_time, factor=RECOMM_FACTOR):
     :param factor: The score factor to calculate recommanded score
     :type factor: list
 
+    :param radius: Only score the streets within the radius (mile) of the
+                   destination. (None: all streets)
+    :type radius: float
+
+    :param method: The distance calculation, 'geodesic' or 'haversine',
+                   see `distance_df`
+    :type method: str
+
     :returns: dataframe of recommanded scores
     :rtype: dataframe
     """
-    # Get all properties
-    df_rate = rate_layer(date_time)
-    df_flow = flow_layer(date_time)
-    df_dist = distance_df(dest)
+    rate_rows, _, values, score = _recomm_arrays(dest, date_time, factor, radius, method)
 
-    # Merge into one DataFrame
-    df_recomm = pd.merge(df_rate, df_flow, on='UNITDESC')
-    df_recomm = pd.merge(df_recomm, df_dist, on='UNITDESC')
-    df_recomm = df_recomm.drop(['TIME'], axis=1)
+    df_recomm = pd.DataFrame({'UNITDESC': _street_column(RATE_FILE, rate_streets, rate_rows),
+                              'RATE': values[:, 0], 'OCCUPANCY': values[:, 1],
+                              'DISTANCE': values[:, 2], 'RECOMM': score})
 
-    # Normalize each column
-    df_recomm['DISTANCE'] = df_recomm['DISTANCE'].apply(np.log10)
+    return df_recomm
 
-    df_recomm.iloc[:, 1:4] = df_recomm.iloc[:, 1:4].apply(
-        lambda x: (x - np.min(x))/(np.max(x) - np.min(x)) if (np.max(x)-np.min(x)) else 1)
 
-    df_recomm['RECOMM'] = np.nan
-    df_recomm['RECOMM'].values[:] = np.dot(
-        df_recomm.iloc[:, 1:-1].values, factor)[:]
+def top_k_streets(dest, date_time, k=10, factor=RECOMM_FACTOR, radius=None,
+                  method='geodesic', geometry=True):
+    """
+    Find the k streets with the best recommanded score. Only the k winners
+    are sorted (by a partial sort of the scores) and returned.
 
-    # Normalize the recommand score
-    r_max = np.max(df_recomm['RECOMM'])
-    r_min = np.min(df_recomm['RECOMM'])
-    df_recomm['RECOMM'] = df_recomm['RECOMM'].apply(
-        lambda x: (r_max - x)/(r_max - r_min))
+    :param dest: The destination coordinates
+    :type dest: tuple-like (lat,long)
 
-    return df_recomm
+    :param date_time: The start time point
+    :type date_time: `datetime`
+
+    :param k: The number of streets
+    :type k: int
+
+    :param factor: The score factor to calculate recommanded score
+    :type factor: list
+
+    :param radius: Only score the streets within the radius (mile) of the
+                   destination. (None: all streets)
+    :type radius: float
+
+    :param method: The distance calculation, 'geodesic' or 'haversine',
+                   see `distance_df`
+    :type method: str
+
+    :param geometry: Add the street lines to the result
+    :type geometry: bool
+
+    :returns: dataframe of the k streets as in `recomm_layer`, best first
+    :rtype: GeoPandas.DataFrame (or dataframe without geometry)
+    """
+    rate_rows, gis_rows, values, score = _recomm_arrays(dest, date_time, factor, radius, method)
+
+    k = max(min(k, len(score)), 0)
+    key = np.where(np.isnan(score), -np.inf, score)
+    top = np.argpartition(-key, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+    # Best first, ties in the order of `recomm_layer`
+    top = top[np.lexsort((top, -key[top]))]
+
+    df_top = pd.DataFrame({'UNITDESC': _street_column(RATE_FILE, rate_streets, rate_rows[top]),
+                           'RATE': values[top, 0], 'OCCUPANCY': values[top, 1],
+                           'DISTANCE': values[top, 2], 'RECOMM': score[top]})
+    if not geometry:
+        return df_top
+
+    lines = dataset.load(GIS_FILE, _street_lines)[gis_rows[top]]
+    df_top = gpd.GeoDataFrame(df_top, geometry=lines)
+
+    return df_top
+
+
+def recomm_layer_batch(dests, times, factor=RECOMM_FACTOR, long_format=False,
+                       method='geodesic', chunk=256):
+    """
+    Generates the recommanded scores of all streets for many queries at
+    once, query i being the destination `dests[i]` at `times[i]`. The
+    datasets are loaded once, the distances of all queries are calculated
+    as one (queries x streets) matrix, and the rate and occupancy of each
+    distinct time are shared by all its queries. The score of each query is
+    the same as `recomm_layer(dests[i], times[i], factor)`.
+
+    :param dests: The destination coordinates (lat, long) of each query
+    :type dests: list of tuple-like
+
+    :param times: The start time point of each query
+    :type times: list of `datetime`
+
+    :param factor: The score factor to calculate recommanded score
+    :type factor: list
+
+    :param long_format: Return a dataframe with one row per query and street
+                        instead of a score matrix
+    :type long_format: bool
+
+    :param method: The distance calculation, 'geodesic' or 'haversine',
+                   see `distance_df`
+    :type method: str
+
+    :param chunk: The number of queries scored together, which bounds the
+                  size of the temporary arrays
+    :type chunk: int
+
+    :returns: The street names and the float32 score matrix (queries x
+              streets), or a dataframe [QUERY, UNITDESC, RECOMM]
+    :rtype: tuple of array, or dataframe
+    """
+    dests = np.asarray(dests, dtype=np.float64).reshape(-1, 2)
+    if len(dests) != len(times):
+        raise ValueError('Got {} destinations but {} times'.format(len(dests), len(times)))
+
+    rate_rows, _, gis_rows = np.asarray(street_rows())
+    points = np.asarray(street_points())
+    lat, lon = points['MID_LAT'][gis_rows], points['MID_LON'][gis_rows]
+    names = np.asarray(rate_cube()[0])[rate_rows]
+
+    # The rate and occupancy of each distinct time
+    keys = [rate_key(date_time) for date_time in times]
+    rate_times = {}
+    for key, date_time in zip(keys, times):
+        rate_times.setdefault(key, date_time)
+    rate_ids = {key: i for i, key in enumerate(rate_times)}
+    rates = np.array([slot_values(date_time, 'RATE') for date_time in rate_times.values()])
+    rate_idx = np.array([rate_ids[key] for key in keys], dtype=np.int64)
+
+    flows = np.asarray(slot_layers()[_OCCUPANCY_PLANE])
+    slots = np.array([flow_slot(date_time) for date_time in times], dtype=np.int64)
+
+    scores = np.empty((len(dests), len(names)), dtype=np.float32)
+    for start in range(0, len(dests), chunk):
+        stop = start + chunk
+        dist = geodesy.distance((dests[start:stop, :1], dests[start:stop, 1:]),
+                                lat, lon, method)
+        scores[start:stop] = recomm_scores(rates[rate_idx[start:stop]],
+                                           flows[slots[start:stop]], dist, factor)[1]
+
+    if not long_format:
+        return names, scores
+
+    df_batch = pd.DataFrame({'QUERY': np.repeat(np.arange(len(dests)), len(names)),
+                             'UNITDESC': _street_column(RATE_FILE, rate_streets,
+                                                        np.tile(rate_rows, len(dests))),
+                             'RECOMM': scores.ravel()})
+
+    return df_batch
+
+
+def snap_dest(dest, grid):
+    """
+    Snap a destination to the center of its cell on a square grid
+
+    :param dest: The destination coordinates (lat, long)
+    :type dest: tuple-like
 
+    :param grid: The cell size of the grid (in meter, 0: no snapping)
+    :type grid: float
 
-def link_to_gis(df_properties, street_geojson=GIS_FILE):
+    :returns: The cell center (lat, long)
+    :rtype: tuple
+    """
+    if not grid:
+        return (float(dest[0]), float(dest[1]))
+
+    lat_step = np.degrees(grid / 1000.0 / geodesy.EARTH_RADIUS)
+    lat = (np.floor(dest[0] / lat_step) + 0.5) * lat_step
+    lon_step = lat_step / np.cos(np.radians(lat))
+    lon = (np.floor(dest[1] / lon_step) + 0.5) * lon_step
+
+    return (float(lat), float(lon))
+
+
+def _recomm_key(dest, date_time, factor, radius):
+    """
+    Get the cache key of a recommendation: the snapped destination, the
+    rate key and flow slot of the time, the query options and the version
+    of the datasets
+
+    :returns: The key
+    :rtype: tuple
+    """
+    return (dest, rate_key(date_time), flow_slot(date_time), tuple(factor), radius,
+            dataset.version(RATE_FILE, flow_file(FLOW_FILE), GIS_FILE))
+
+
+RECOMM_CACHE = LayerCache(maxsize=512, ttl=3600)
+
+
+def cached_recomm_layer(dest, date_time, factor=RECOMM_FACTOR, radius=None,
+                        grid=50, cache=RECOMM_CACHE):
+    """
+    Generates a dataframe with recommanded score for all streets, served
+    from a cache. The destination is snapped to a grid cell and the time
+    to its flow slot (6 minutes), so nearby requests at close times share
+    one result. Results are dropped once a dataset changes on disk.
+
+    :param dest: The destination coordinates
+    :type dest: tuple-like (lat,long)
+
+    :param date_time: The start time point
+    :type date_time: `datetime`
+
+    :param factor: The score factor to calculate recommanded score
+    :type factor: list
+
+    :param radius: Only score the streets within the radius (mile) of the
+                   destination. (None: all streets)
+    :type radius: float
+
+    :param grid: The cell size to snap the destination (in meter, 0: exact)
+    :type grid: float
+
+    :param cache: The cache to store the results
+    :type cache: `LayerCache`
+
+    :returns: dataframe of recommanded scores
+    :rtype: dataframe
+    """
+    dest = snap_dest(dest, grid)
+    key = _recomm_key(dest, date_time, factor, radius)
+    df_recomm = cache.get(key, lambda: recomm_layer(dest, date_time, factor, radius))
+
+    return df_recomm.copy()
+
+
+def link_to_gis(df_properties, street_geojson=GIS_FILE, zoom=None):
     """
     Add GIS info to properties dataframe
 
@@ -446,86 +1283,320 @@ def link_to_gis(df_properties, street_geojson=GIS_FILE):
     :param street_geojson: the JSON file constaining street info
     :type street_geojson: str
 
+    :param zoom: The map zoom to simplify the streets for, see
+                 `street_level` (None: full resolution)
+    :type zoom: int
+
     :returns: a dataframe linked to gis
     :rtype: GeoPandas.DataFrame
     """
 
-    gis = gpd.read_file(street_geojson)
-    df_properties = pd.merge(df_properties, gis[['UNITDESC', 'geometry']],
-                             on='UNITDESC')
+    rows = _gis_rows(df_properties['UNITDESC'], street_geojson)
+    linked = rows >= 0
+    df_properties = df_properties.loc[linked].reset_index(drop=True).assign(
+        geometry=street_lines(street_geojson, zoom)[rows[linked]])
     df_gis = gpd.GeoDataFrame(df_properties, crs={'init' :'epsg:4326'},
                               geometry='geometry')
 
     return df_gis
 
 
-def ev_layer(ev_gis=EV_FILE):
+def _street_fragments(street_geojson):
     """
-    Read the EV charging stations datafile and convert into a
-    GeoPandas.DataFrame
-    
-    :param ev_gis: the JSON file constaining layer info
-    :type ev_gis: str
+    Get the pre-serialized geometries of all streets, see
+    `streets.read_fragments`
 
-    :returns: a dataframe of the layer
-    :rtype: GeoPandas.DataFrame
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The position of each street name and the JSON text of the
+              street geometries, memory-mapped from 'data/build/'
+    :rtype: tuple (pandas.Index, `StringTable`)
     """
-    df_ev = gpd.read_file(ev_gis)
-    return df_ev
+    names, fragments = (
+        dataset.string_artifact(dataset.artifact_file(street_geojson, name), [street_geojson],
+                                lambda i=i: streets.read_fragments(street_geojson)[i])
+        for i, name in enumerate(('names', 'fragments')))
 
+    return pd.Index(names.tolist()), fragments
 
-def select_station(staion_name, df_entire):
+
+def _level_fragments(street_geojson, level):
     """
-    Select a specific street info from entire dataframe
+    Get the pre-serialized geometries of all streets at a level, see
+    `street_level`
 
-    :param street_name: The given street name
-    :type street_name: str
+    :returns: The JSON text of the street geometries, memory-mapped from
+              'data/build/'
+    :rtype: `StringTable`
+    """
+    return dataset.string_artifact(
+        dataset.artifact_file(street_geojson, 'fragments_z{}'.format(level), _LEVEL_VERSION),
+        [street_geojson], lambda: streets.line_fragments(*street_level(level, street_geojson)))
 
-    :param df_entire: The dataframe containing all streets
-    :type df_entire: dataframe
 
-    :returns: a dataframe containing specific station
-    :rtype: dataframe
+def to_geojson(df_properties, street_geojson=GIS_FILE, zoom=None):
     """
+    Serialize a properties dataframe linked to GIS as a GeoJSON feature
+    collection. This gives the same features as
+    `link_to_gis(df_properties, zoom=zoom).to_json()`, but the geometries
+    are spliced from pre-serialized text and only the properties are
+    encoded.
 
-    info = df_entire.loc[df_entire['Station Name'] == staion_name]
-    return info
+    :param df_properties: the dataframe of properties
+    :type df_properties: dataframe
+
+    :param street_geojson: the JSON file constaining street info
+    :type street_geojson: str
 
+    :param zoom: The map zoom to simplify the streets for, see
+                 `street_level` (None: full resolution)
+    :type zoom: int
 
-class EStation():
+    :returns: The GeoJSON text
+    :rtype: str
     """
-    The class `EStation` contains all information of a EV charging station
-    for future details display.
+    fragments = dataset.load(street_geojson, _street_fragments)[1]
+    level = _zoom_level(zoom)
+    if level is not None:
+        fragments = dataset.load(street_geojson, _level_fragments, level=level)
+    rows = _gis_rows(df_properties['UNITDESC'], street_geojson)
+    linked = rows >= 0
 
-    Attributes:
-    ---------------------
-    name:   The street name
-    plot:   Occupancy over time figure
-    rate:   Parking rate table
-    limit:  Parking limit (in hour)
+    df_properties = df_properties.loc[linked]
+    props = df_properties.astype(object).where(df_properties.notnull(), None)
+    columns = list(df_properties.columns)
+
+    return _feature_collection([dict(zip(columns, values)) for values in props.values.tolist()],
+                               [fragments[row] for row in rows[linked]])
+
+
+def _feature_collection(properties, fragments):
     """
+    Splice the properties and the pre-serialized geometries of features
+    into a GeoJSON feature collection, see `to_geojson`
 
-    def __init__(self, station_name):
-        """
-        :param station_name: The given station name
-        :type station_name: str
-        """
+    :param properties: The properties of each feature
+    :type properties: list of dict
+
+    :param fragments: The JSON text of the geometry of each feature
+    :type fragments: list of str
+
+    :returns: The GeoJSON text
+    :rtype: str
+    """
+    features = ['{{"id": "{}", "type": "Feature", "properties": {}, "geometry": {}}}'
+                .format(i, json.dumps(props), fragment)
+                for i, (props, fragment) in enumerate(zip(properties, fragments))]
+
+    return ('{"type": "FeatureCollection", "features": [' + ', '.join(features) + '], '
+            '"crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC::CRS84"}}}')
+
+
+SLOT_CACHE = LayerCache(maxsize=64, ttl=None)
+
+
+def slot_geojson(date_time, prop, zoom=None, cache=SLOT_CACHE):
+    """
+    Generates the GeoJSON of the rate or occupancy layer at a datetime
+    from the slot table (see `slot_layers`) and the pre-serialized street
+    geometries, without building a dataframe. The features are the same as
+    `to_geojson(rate_layer(date_time), zoom=zoom)` (or `flow_layer`) for
+    the streets of all three files.
+
+    :param date_time: The start time of parking
+    :type date_time: `datatime`
+
+    :param prop: 'RATE' or 'OCCUPANCY'
+    :type prop: str
 
-        self.name = station_name
+    :param zoom: The map zoom to simplify the streets for, see
+                 `street_level` (None: full resolution)
+    :type zoom: int
+
+    :param cache: The cache to store the results
+    :type cache: `LayerCache`
+
+    :returns: The GeoJSON text
+    :rtype: str
+    """
+    level = _zoom_level(zoom)
+    time_key = rate_key(date_time) if prop == 'RATE' else flow_slot(date_time)
+    key = (prop, time_key, level, dataset.version(RATE_FILE, flow_file(FLOW_FILE), GIS_FILE))
+
+    def compute():
+        values = slot_values(date_time, prop)
+        rate_rows, flow_rows, gis_rows = np.asarray(street_rows())
+        fragments = (dataset.load(GIS_FILE, _street_fragments)[1] if level is None
+                     else dataset.load(GIS_FILE, _level_fragments, level=level))
+        names = np.asarray(rate_cube()[0])[rate_rows].tolist()
+        numbers = [None if np.isnan(value) else value for value in values.tolist()]
+
+        if prop == 'RATE':
+            order = range(len(rate_rows))
+            properties = [{'UNITDESC': names[i], 'RATE': numbers[i]} for i in order]
+        else:
+            # In the order of `flow_layer`
+            order = np.argsort(flow_rows).tolist()
+            time = float(TIME_SLOTS[flow_slot(date_time)])
+            properties = [{'TIME': time, 'OCCUPANCY': numbers[i], 'UNITDESC': names[i]}
+                          for i in order]
+
+        return _feature_collection(properties, [fragments[gis_rows[i]] for i in order])
+
+    return cache.get(key, compute)
+
+
+# The GeoJSON texts (~0.5 MB each) are kept apart from the dataframes
+GEOJSON_CACHE = LayerCache(maxsize=32, ttl=3600)
+
+
+def recomm_geojson(dest, date_time, factor=RECOMM_FACTOR, radius=None,
+                   grid=50, cache=RECOMM_CACHE, geojson_cache=GEOJSON_CACHE):
+    """
+    Generates the GeoJSON of the recommanded scores of all streets, served
+    from a cache of its own, and built from `cached_recomm_layer`
+
+    :param dest: The destination coordinates
+    :type dest: tuple-like (lat,long)
 
-        df_ev = gpd.read_file(EV_FILE)
-        ev_row = select_station(self.name, df_ev)
+    :param date_time: The start time point
+    :type date_time: `datetime`
+
+    :param factor: The score factor to calculate recommanded score
+    :type factor: list
+
+    :param radius: Only score the streets within the radius (mile) of the
+                   destination. (None: all streets)
+    :type radius: float
+
+    :param grid: The cell size to snap the destination (in meter, 0: exact)
+    :type grid: float
+
+    :param cache: The cache to store the dataframes of the scores
+    :type cache: `LayerCache`
+
+    :param geojson_cache: The cache to store the GeoJSON texts
+    :type geojson_cache: `LayerCache`
+
+    :returns: The GeoJSON text, see `to_geojson`
+    :rtype: str
+    """
+    key = _recomm_key(snap_dest(dest, grid), date_time, factor, radius)
+
+    return geojson_cache.get(key, lambda: to_geojson(
+        cached_recomm_layer(dest, date_time, factor, radius, grid, cache)))
+
+
+def _geometry_payload(street_geojson, precision=None):
+    """
+    Serialize the geometries of all streets as a GeoJSON feature collection
+    whose feature ids are the street positions used by `layer_payload`
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :param precision: The number of decimals of the coordinates (None: as
+                      in the file)
+    :type precision: int
+
+    :returns: The GeoJSON text
+    :rtype: str
+    """
+    names, fragments = dataset.load(street_geojson, _street_fragments)
+    if precision is not None:
+        coords, part_offsets, offsets, multi = street_geometry(street_geojson)
+        fragments = streets.line_fragments(np.round(coords, precision), part_offsets,
+                                           offsets, multi)
+
+    features = ['{{"id": {}, "type": "Feature", "properties": {}, "geometry": {}}}'
+                .format(i, json.dumps({'UNITDESC': name}), fragment)
+                for i, (name, fragment) in enumerate(zip(names, fragments))]
+
+    return '{"type": "FeatureCollection", "features": [' + ', '.join(features) + ']}'
+
+
+def geometry_payload(street_geojson=GIS_FILE, precision=None):
+    """
+    Get the GeoJSON of all street geometries without layer properties. It
+    is sent to the browser once; later layer updates only send the values
+    of each street, see `layer_payload`.
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :param precision: The number of decimals of the coordinates (e.g. 6:
+                      ~0.1 m, None: as in the file)
+    :type precision: int
+
+    :returns: The GeoJSON text, feature i being the street i
+    :rtype: str
+    """
+    return dataset.load(street_geojson, _geometry_payload, precision=precision)
+
+
+def street_values(df_properties, prop, street_geojson=GIS_FILE):
+    """
+    Align a property with the streets of the GIS file
+
+    :param df_properties: the dataframe of properties
+    :type df_properties: dataframe
+
+    :param prop: The property column (e.g. 'RECOMM')
+    :type prop: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The property of each street in the file order (NaN: missing)
+    :rtype: float64 array
+    """
+    names = dataset.load(street_geojson, _street_fragments)[0]
+    rows = _gis_rows(df_properties['UNITDESC'], street_geojson)
+    linked = rows >= 0
+
+    values = np.full(len(names), np.nan)
+    values[rows[linked]] = df_properties[prop].values[linked]
+
+    return values
+
+
+# The formats of `layer_payload`
+PAYLOAD_FORMATS = tuple(wire.DTYPES) + ('json',)
+
+
+def layer_payload(df_properties, props, fmt='uint8', street_geojson=GIS_FILE):
+    """
+    Encode the properties of a layer without geometry, for the browser to
+    join with `geometry_payload` by street id
+
+    :param df_properties: the dataframe of properties
+    :type df_properties: dataframe
+
+    :param props: The property columns (e.g. ['RECOMM'])
+    :type props: list
+
+    :param fmt: 'uint8' or 'float16' -- a typed array per property, see
+                `wire.encode_values`; 'json' -- the properties keyed by
+                street id
+    :type fmt: str
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The JSON-serializable payload
+    :rtype: dict
+    """
+    if fmt not in PAYLOAD_FORMATS:
+        raise ValueError("Unknown payload format '{}', expected one of {}"
+                         .format(fmt, PAYLOAD_FORMATS))
+    values = {prop: street_values(df_properties, prop, street_geojson) for prop in props}
+    if fmt != 'json':
+        return {prop: wire.encode_values(value, fmt) for prop, value in values.items()}
 
-        self.address = ev_row['Street Address'].values[0]
-        self.code = ev_row['ZIP'].values[0]
-        self.phone = ev_row["Station Phone"].values[0]
+    linked = np.flatnonzero(~np.all([np.isnan(value) for value in values.values()], axis=0))
+    return {str(i): {prop: (None if np.isnan(value[i]) else float(value[i]))
+                     for prop, value in values.items()}
+            for i in linked}
 
-        self.level1 = ev_row['Level 1'].values[0]
-        self.level2 = ev_row['Level 2'].values[0]
-        self.dc = ev_row['DC Fast'].values[0]
 
-        self.NEMA520 = ev_row['NEMA520'].values[0]
-        self.J1772 = ev_row['J1772'].values[0]
-        self.J1772COMBO = ev_row['J1772COMBO'].values[0]
-        self.CHADEMO = ev_row['CHADEMO'].values[0]
-        self.TESLA = ev_row['TESLA'].values[0]
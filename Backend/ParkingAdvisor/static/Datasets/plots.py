@@ -0,0 +1,113 @@
+"""
+This module renders the occupancy profile of each street once and serves
+it from caches, so concurrent requests never share a figure or overwrite
+each other's image. A plot is named by the hash of the street and the
+version of the flow dataset, kept in an in-process LRU cache and saved to
+a folder which can be served as static files, with one subfolder per
+version of the flow dataset.
+"""
+
+import hashlib
+import io
+import os
+
+from . import dataset
+from .cache import LayerCache
+from .filter import Street
+from .flows import flow_file
+from .paths import DATA_PATH, FLOW_FILE
+
+
+FORMATS = ('svg', 'png')
+PLOT_DIR = os.path.join(DATA_PATH, 'build', 'plots')
+PLOT_CACHE = LayerCache(maxsize=512, ttl=None)
+# SVG plots are drawn without matplotlib, see `svgchart`
+_BACKENDS = {'svg': 'svg', 'png': 'matplotlib'}
+
+
+def render(fig, fmt='svg'):
+    """
+    Render a figure
+
+    :param fig: The figure
+    :type fig: matplotlib.figure.Figure
+
+    :param fmt: 'svg' or 'png'
+    :type fmt: str
+
+    :returns: The image
+    :rtype: bytes
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Unknown plot format '{}', expected one of {}".format(fmt, FORMATS))
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches='tight')
+
+    return buffer.getvalue()
+
+
+def _plot_version():
+    """
+    Get the version of the saved plots, which changes whenever the flow
+    dataset changes
+
+    :returns: The version
+    :rtype: str
+    """
+    versions = dataset.version(flow_file(FLOW_FILE))
+    return hashlib.md5(repr(versions).encode('utf8')).hexdigest()[:12]
+
+
+def _plot_name(street_name, fmt):
+    """
+    Get the file name of a street plot, in the folder of the flow dataset
+    version and changing whenever the renderer changes
+
+    :returns: The file name (e.g. '8c1d...e0/3f2a...9c.svg')
+    :rtype: str
+    """
+    key = (street_name, _BACKENDS[fmt])
+    digest = hashlib.sha1(repr(key).encode('utf8')).hexdigest()[:20]
+
+    return '{}/{}.{}'.format(_plot_version(), digest, fmt)
+
+
+def flow_plot(street, fmt='svg', cache_dir=PLOT_DIR):
+    """
+    Get the occupancy profile of a street, rendered on the first request
+    and served from the caches afterwards. The saved plots of older flow
+    dataset versions are removed.
+
+    :param street: The street, or its name in any case or spacing
+    :type street: Street or str
+
+    :param fmt: 'svg' or 'png'
+    :type fmt: str
+
+    :param cache_dir: The folder of saved plots (None: memory only)
+    :type cache_dir: str
+
+    :returns: The file name of the plot (relative to `cache_dir`) and the
+              image
+    :rtype: tuple (str, bytes)
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Unknown plot format '{}', expected one of {}".format(fmt, FORMATS))
+    if not isinstance(street, Street):
+        street = Street(street)
+    name = _plot_name(street.name, fmt)
+    path = os.path.join(cache_dir, name) if cache_dir is not None else None
+
+    def compute():
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as file:
+                return file.read()
+        if _BACKENDS[fmt] == 'svg':
+            image = street.get_flow_plot('svg').encode('utf8')
+        else:
+            image = render(street.get_flow_plot(), fmt)
+        if path is not None and dataset.save_file(path, image):
+            dataset.prune_versions(cache_dir, os.path.dirname(name))
+        return image
+
+    return name, PLOT_CACHE.get((cache_dir, name), compute)
@@ -0,0 +1,183 @@
+"""
+This module contains the EV charging stations: their layer, their
+clusters at low map zooms and the lookup of a station by its name.
+"""
+
+import numpy as np
+
+from . import dataset, store
+from .lazy import lazy_import
+from .lookup import name_index
+from .mvt import pixel_size
+from .paths import EV_FILE
+
+gpd = lazy_import('geopandas')
+
+# Map zoom from which the stations are drawn one by one
+EV_ZOOM = 15
+
+
+def _dataset_columns(path, file_reader):
+    """
+    Get the columns of a dataset file as arrays, which are shared without
+    copying the dataframe
+
+    :returns: The values of each column
+    :rtype: dict
+    """
+    df_entire = dataset.load(path, file_reader)
+
+    return {column: df_entire[column].values for column in df_entire.columns}
+
+
+def ev_layer(ev_gis=EV_FILE):
+    """
+    Read the EV charging stations datafile and convert into a
+    GeoPandas.DataFrame
+    
+    :param ev_gis: the JSON file constaining layer info
+    :type ev_gis: str
+
+    :returns: a dataframe of the layer
+    :rtype: GeoPandas.DataFrame
+    """
+    df_ev = dataset.load(ev_gis, store.read_geo)
+    return df_ev
+
+
+def _ev_clusters(ev_gis, zoom):
+    """
+    Cluster the EV charging stations on a grid of 64 pixels at a map zoom
+
+    :returns: a dataframe of the clusters
+    :rtype: GeoPandas.DataFrame
+    """
+    df_ev = dataset.load(ev_gis, store.read_geo)
+    lon, lat = df_ev.geometry.x.values, df_ev.geometry.y.values
+
+    # Square cells on the map: the cell height shrinks with the latitude
+    cell = pixel_size(zoom) * 64
+    cols = np.floor(lon / cell).astype(np.int64)
+    rows = np.floor(lat / (cell * np.cos(np.radians(np.mean(lat))))).astype(np.int64)
+    _, cluster = np.unique(np.stack([cols, rows], axis=-1), axis=0, return_inverse=True)
+    cluster = cluster.ravel()
+
+    count = np.bincount(cluster)
+    df_clusters = gpd.GeoDataFrame(
+        {'COUNT': count},
+        geometry=gpd.points_from_xy(np.bincount(cluster, lon) / count,
+                                    np.bincount(cluster, lat) / count),
+        crs=df_ev.crs)
+
+    return df_clusters
+
+
+def ev_clusters(zoom, ev_gis=EV_FILE):
+    """
+    Get the EV charging stations to draw at a map zoom. Below `EV_ZOOM`
+    the stations close on the map are merged into one cluster point.
+
+    :param zoom: The map zoom
+    :type zoom: int
+
+    :param ev_gis: the JSON file constaining layer info
+    :type ev_gis: str
+
+    :returns: a dataframe of the clusters [COUNT, geometry], or of the
+              stations (see `ev_layer`) from `EV_ZOOM`
+    :rtype: GeoPandas.DataFrame
+    """
+    if zoom >= EV_ZOOM:
+        return ev_layer(ev_gis)
+
+    return dataset.load(ev_gis, _ev_clusters, zoom=int(zoom))
+
+
+def search_stations(text, limit=10, ev_gis=EV_FILE):
+    """
+    Find the EV charging station names starting with a text, e.g. for
+    autocomplete
+
+    :param text: The start of the station name, in any case or spacing
+    :type text: str
+
+    :param limit: The maximum number of names (None: all)
+    :type limit: int
+
+    :param ev_gis: the JSON file constaining layer info
+    :type ev_gis: str
+
+    :returns: The station names, in alphabetical order
+    :rtype: list of str
+    """
+    return name_index(ev_gis, store.read_geo, 'Station Name').prefix(text, limit)
+
+
+def select_station(staion_name, df_entire, index=None):
+    """
+    Select a specific street info from entire dataframe
+
+    :param street_name: The given street name
+    :type street_name: str
+
+    :param df_entire: The dataframe containing all streets
+    :type df_entire: dataframe
+
+    :param index: The index of the names of `df_entire` (see `name_index`)
+                  to look the station up in constant time, matching the
+                  name in any case or spacing (None: compare every row)
+    :type index: `NameIndex`
+
+    :returns: a dataframe containing specific station
+    :rtype: dataframe
+    """
+    if index is not None:
+        return df_entire.iloc[index.rows(staion_name)]
+
+    info = df_entire.loc[df_entire['Station Name'] == staion_name]
+    return info
+
+
+class EStation():
+    """
+    The class `EStation` contains all information of a EV charging station
+    for future details display.
+
+    Attributes:
+    ---------------------
+    name:       The station name
+    address:    Street address
+    code:       ZIP code
+    phone:      Station phone
+    level1, level2, dc:     Charging levels
+    NEMA520, J1772, J1772COMBO, CHADEMO, TESLA:     Connector types
+
+    NOTE
+        A station only keeps the position of its row in the shared EV
+        dataset and reads the attributes from it on access.
+    """
+
+    __slots__ = ('name', '_row')
+
+    _FIELDS = {'address': 'Street Address', 'code': 'ZIP', 'phone': 'Station Phone',
+               'level1': 'Level 1', 'level2': 'Level 2', 'dc': 'DC Fast',
+               'NEMA520': 'NEMA520', 'J1772': 'J1772', 'J1772COMBO': 'J1772COMBO',
+               'CHADEMO': 'CHADEMO', 'TESLA': 'TESLA'}
+
+    def __init__(self, station_name):
+        """
+        :param station_name: The given station name
+        :type station_name: str
+        """
+        ev_index = name_index(EV_FILE, store.read_geo, 'Station Name')
+        self.name = ev_index.name(station_name) or station_name
+        self._row = ev_index.rows(self.name)[0]
+
+    def __getattr__(self, attr):
+        column = EStation._FIELDS.get(attr)
+        if column is None:
+            raise AttributeError("'EStation' object has no attribute '{}'".format(attr))
+
+        columns = dataset.load(EV_FILE, _dataset_columns, file_reader=store.read_geo)
+
+        return columns[column][self._row]
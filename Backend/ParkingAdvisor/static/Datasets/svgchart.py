@@ -0,0 +1,82 @@
+"""
+This module draws the occupancy chart of a street (see `filter.plot_flow`)
+as SVG text straight from the flow arrays, without matplotlib. The layout
+follows the matplotlib figure: a filled area over 8 AM - 12 AM, a grid at
+the ticks, and only the bottom axis line.
+"""
+
+import numpy as np
+
+
+WIDTH, HEIGHT = 288, 180  # 4 x 2.5 inch, in pt
+LEFT, RIGHT, TOP, BOTTOM = 42, 278, 8, 156  # The plot area
+X_RANGE = (8, 24)
+X_TICKS = ((8, '8 AM'), (12, '12 PM'), (16, '4 PM'), (20, '8 PM'), (24, '12 AM'))
+Y_TICKS = ((0, '0'), (0.5, '50'), (1, '100 %'))
+
+EDGE_COLOR = '#1B5C99'
+FACE_COLOR = '#84B5D1'
+GRID_COLOR = '#696969'  # dimgrey
+FONT = 'font-family="DejaVu Sans, Arial, sans-serif" font-size="12"'
+
+
+def _x(time):
+    "Map hours to the horizontal position"
+    scale = (RIGHT - LEFT) / (X_RANGE[1] - X_RANGE[0])
+    return LEFT + (np.asarray(time, dtype=np.float64) - X_RANGE[0]) * scale
+
+
+def _y(flow):
+    "Map occupancy rates to the vertical position"
+    return BOTTOM - np.clip(np.asarray(flow, dtype=np.float64), 0, 1) * (BOTTOM - TOP)
+
+
+def flow_svg(time, flow):
+    """
+    Draw the occupancy chart of a street
+
+    :param time: The time of each point (hour)
+    :type time: array
+
+    :param flow: The occupancy rate of each point
+    :type flow: array
+
+    :returns: The SVG document
+    :rtype: str
+    """
+    time = np.asarray(time, dtype=np.float64)
+    flow = np.asarray(flow, dtype=np.float64)
+    shown = (time >= X_RANGE[0]) & (time <= X_RANGE[1]) & ~np.isnan(flow)
+    x, y = _x(time[shown]), _y(flow[shown])
+
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}pt" height="{1}pt" '
+             'viewBox="0 0 {0} {1}">'.format(WIDTH, HEIGHT)]
+
+    # Grid and tick labels
+    for tick, label in X_TICKS:
+        pos = float(_x(tick))
+        parts.append('<line x1="{0:.1f}" y1="{1}" x2="{0:.1f}" y2="{2}" stroke="{3}" '
+                     'stroke-opacity="0.5" stroke-width="0.8"/>'.format(pos, TOP, BOTTOM, GRID_COLOR))
+        parts.append('<text x="{:.1f}" y="{}" text-anchor="middle" {}>{}</text>'
+                     .format(pos, BOTTOM + 20, FONT, label))
+    for tick, label in Y_TICKS:
+        pos = float(_y(tick))
+        parts.append('<line x1="{0}" y1="{2:.1f}" x2="{1}" y2="{2:.1f}" stroke="{3}" '
+                     'stroke-opacity="0.5" stroke-width="0.8"/>'.format(LEFT, RIGHT, pos, GRID_COLOR))
+        parts.append('<text x="{}" y="{:.1f}" text-anchor="end" dominant-baseline="middle" {}>{}</text>'
+                     .format(LEFT - 4, pos, FONT, label))
+
+    # Filled area down to 0 %
+    if len(x):
+        points = ' '.join('{:.1f},{:.1f}'.format(*point)
+                          for point in np.stack([x, y], axis=-1).tolist())
+        parts.append('<path d="M{:.1f},{} L{} L{:.1f},{} Z" fill="{}" fill-opacity="0.5" '
+                     'stroke="{}" stroke-opacity="0.5" stroke-width="2"/>'
+                     .format(x[0], BOTTOM, points, x[-1], BOTTOM, FACE_COLOR, EDGE_COLOR))
+
+    # Only the bottom spine is drawn
+    parts.append('<line x1="{0}" y1="{2}" x2="{1}" y2="{2}" stroke="black" stroke-width="0.8"/>'
+                 .format(LEFT, RIGHT, BOTTOM))
+    parts.append('</svg>')
+
+    return '\n'.join(parts)
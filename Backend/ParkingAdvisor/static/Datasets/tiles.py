@@ -0,0 +1,222 @@
+"""
+This module serves the street layers as vector tiles (MVT), so a map only
+loads the streets of the visible tiles. The geometry of each tile is
+clipped and simplified to the tile grid, and generated tiles are cached
+on disk by layer, time slot and tile. Recommendation tiles depend on the
+destination, so they are only cached in memory.
+"""
+
+import hashlib
+import os
+from datetime import datetime
+
+import numpy as np
+
+from . import dataset, mvt
+from .cache import LayerCache
+from .filter import (cached_recomm_layer, flow_layer, rate_layer, snap_dest, street_values,
+                     streets_in_bounds)
+from .flows import flow_file, flow_slot
+from .lazy import lazy_import
+from .paths import DATA_PATH, FLOW_FILE, GIS_FILE, RATE_FILE
+from .rates import rate_key
+
+shapely = lazy_import('shapely')
+
+
+LAYERS = {'rate': 'RATE', 'occupancy': 'OCCUPANCY', 'recomm': 'RECOMM'}
+TILE_DIR = os.path.join(DATA_PATH, 'build', 'tiles')
+BUFFER = 64  # Tile grid units drawn around the tile, so lines join across tiles
+MAX_ZOOM = 22
+RECOMM_TILES = LayerCache(maxsize=1024, ttl=3600)
+
+
+def valid_tile(z, x, y):
+    """
+    Check a tile is on the web mercator grid and not deeper than MAX_ZOOM
+
+    :param z, x, y: The zoom level and the column and row of the tile
+    :type z, x, y: int
+
+    :returns: Whether the tile exists
+    :rtype: bool
+    """
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _layer_slot(layer, date_time, dest):
+    """
+    Get the slot of a layer at a time: all times of a slot have the same
+    layer values
+
+    :param layer: 'rate', 'occupancy' or 'recomm'
+    :type layer: str
+
+    :param date_time: The start time point
+    :type date_time: `datetime`
+
+    :param dest: The snapped destination coordinates (lat, long), for 'recomm'
+    :type dest: tuple
+
+    :returns: The slot
+    :rtype: tuple
+    """
+    if layer == 'rate':
+        return rate_key(date_time)
+    if layer == 'occupancy':
+        return (flow_slot(date_time),)
+
+    return dest + rate_key(date_time) + (flow_slot(date_time),)
+
+
+def _layer_values(layer, date_time, dest, street_geojson):
+    """
+    Get the values of a layer at a time
+
+    :returns: The value of each street in the GIS file order
+    :rtype: array
+    """
+    if layer == 'rate':
+        df_layer = rate_layer(date_time)
+    elif layer == 'occupancy':
+        df_layer = flow_layer(date_time)
+    else:
+        df_layer = cached_recomm_layer(dest, date_time, grid=0)
+
+    return street_values(df_layer, LAYERS[layer], street_geojson)
+
+
+def _tile_version(street_geojson):
+    """
+    Get the version of the tile cache, which changes whenever a dataset
+    changes on disk, so stale tiles are never served
+
+    :returns: The version
+    :rtype: str
+    """
+    versions = dataset.version(RATE_FILE, flow_file(FLOW_FILE), street_geojson)
+    return hashlib.md5(repr(versions).encode('utf8')).hexdigest()[:12]
+
+
+def _tile_file(cache_dir, version, layer, slot, z, x, y):
+    """
+    Get the cache file of a tile
+
+    :returns: The tile file
+    :rtype: str
+    """
+    slot = '_'.join(str(key) for key in slot)
+
+    return os.path.join(cache_dir, version, layer, slot, str(z), str(x), '{}.mvt'.format(y))
+
+
+def build_tile(layer, z, x, y, values, street_geojson=GIS_FILE):
+    """
+    Encode the streets crossing a tile with their layer values
+
+    :param layer: 'rate', 'occupancy' or 'recomm'
+    :type layer: str
+
+    :param z, x, y: The zoom level and the column and row of the tile
+    :type z, x, y: int
+
+    :param values: The value of each street in the GIS file order
+    :type values: array
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The MVT tile
+    :rtype: bytes
+    """
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(z, x, y)
+    pad_lon = (max_lon - min_lon) * BUFFER / mvt.EXTENT
+    pad_lat = (max_lat - min_lat) * BUFFER / mvt.EXTENT
+    bounds = (min_lon - pad_lon, min_lat - pad_lat, max_lon + pad_lon, max_lat + pad_lat)
+
+    gdf = streets_in_bounds(bounds, street_geojson)
+    lines = shapely.intersection(gdf.geometry.to_numpy(), shapely.box(*bounds))
+    # Simplify on the tile grid: vertices closer than one unit are dropped
+    lines = shapely.transform(lines, lambda coords: mvt.project(coords, z, x, y))
+    lines = shapely.simplify(lines, 1.0)
+
+    # Split the clipped lines into their line parts, dropping touching points
+    parts, owner = shapely.get_parts(lines, return_index=True)
+    is_line = shapely.get_type_id(parts) == 1
+    parts, owner = parts[is_line], owner[is_line]
+    coords, part_idx = shapely.get_coordinates(parts, return_index=True)
+    part_lines = np.split(np.rint(coords), np.flatnonzero(np.diff(part_idx)) + 1)
+    owner_starts = np.searchsorted(owner, np.arange(len(lines) + 1))
+
+    features = []
+    for i, (position, name) in enumerate(zip(gdf.index, gdf['UNITDESC'])):
+        features.append((position, {'UNITDESC': name, LAYERS[layer]: float(values[position])},
+                         part_lines[owner_starts[i]:owner_starts[i + 1]]))
+
+    return mvt.encode_tile([mvt.encode_layer(layer, features)])
+
+
+def street_tile(layer, z, x, y, date_time=None, dest=None, street_geojson=GIS_FILE,
+                cache_dir=TILE_DIR):
+    """
+    Get a vector tile of a street layer, served from the disk cache when
+    it has been generated for the same time slot. Recommendation tiles
+    are served from the in-memory RECOMM_TILES cache instead.
+
+    :param layer: 'rate', 'occupancy' or 'recomm'
+    :type layer: str
+
+    :param z, x, y: The zoom level and the column and row of the tile
+    :type z, x, y: int
+
+    :param date_time: The start time point (None: now)
+    :type date_time: `datetime`
+
+    :param dest: The destination coordinates (lat, long), for 'recomm'
+    :type dest: tuple-like
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :param cache_dir: The folder of cached tiles (None: no disk cache)
+    :type cache_dir: str
+
+    :returns: The MVT tile
+    :rtype: bytes
+
+    :raises ValueError: If the layer or the tile does not exist
+    """
+    if layer not in LAYERS:
+        raise ValueError("Unknown layer '{}', expected one of {}".format(layer, tuple(LAYERS)))
+    if not valid_tile(z, x, y):
+        raise ValueError("Tile {}/{}/{} is outside the grid".format(z, x, y))
+    if layer == 'recomm':
+        if dest is None:
+            raise ValueError("The 'recomm' layer needs a destination")
+        dest = snap_dest(dest, 50)
+    if date_time is None:
+        date_time = datetime.now()
+
+    version = _tile_version(street_geojson)
+    slot = _layer_slot(layer, date_time, dest)
+
+    def compute():
+        values = _layer_values(layer, date_time, dest, street_geojson)
+        return build_tile(layer, z, x, y, values, street_geojson)
+
+    if layer == 'recomm':
+        return RECOMM_TILES.get((version, street_geojson) + slot + (z, x, y), compute)
+    if cache_dir is None:
+        return compute()
+
+    path = _tile_file(cache_dir, version, layer, slot, z, x, y)
+    if os.path.exists(path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    tile = compute()
+    # Tiles are only served from memory if the folder is not writable
+    if dataset.save_file(path, tile):
+        dataset.prune_versions(cache_dir, version)
+
+    return tile
@@ -4,7 +4,8 @@ Create colormap based on rank mode
 import branca.colormap as cm
 import folium
 import geopandas as gpd
-from .filter import rate_layer, recomm_layer, flow_layer, link_to_gis, ev_layer
+from .filter import (rate_layer, recomm_layer, flow_layer, link_to_gis, ev_layer, to_geojson,
+                     ev_clusters, slot_geojson)
 
 
 def color_bar(mode):
@@ -51,7 +52,7 @@ class MapLayer(folium.Map):
     """
     Create a MayLAyer baseed on desticnation, parking lime
     """
-    def __init__(self, date_time, dest, mode=0):
+    def __init__(self, date_time, dest, mode=0, radius=None, zoom=None):
         """
         :param date_time: time of a day
         :type date_time: datetime
@@ -59,15 +60,26 @@ class MapLayer(folium.Map):
         :param dest: destination coordinates (longitude, latitude)
         :type dest: tuple
 
+        :param radius: only show recommendations within the radius (mile)
+                       of the destination (None: all streets)
+        :type radius: float
+
+        :param zoom: the initial map zoom, which also picks the simplified
+                     street level and the EV clusters to draw (None: zoom 14
+                     with the full street geometry and every EV station)
+        :type zoom: int
+
         """
         self.mode = mode
         self.time = date_time
         self.dest = dest
+        self.radius = radius
+        self.zoom = zoom
 
         super(MapLayer, self).__init__(location=self.dest,
                                        tiles='cartodbpositron',
-                                       zoom_start=14)
-        self.gdf = gpd.GeoDataFrame()
+                                       zoom_start=14 if zoom is None else zoom)
+        self._gdf = gpd.GeoDataFrame()
         
         if self.mode in [1, 2, 3]:
             self.colormap = color_bar(mode)
@@ -76,29 +88,58 @@ class MapLayer(folium.Map):
         else:
             pass
         folium.Marker(location=self.dest).add_to(self)
-        self.ev = ev_layer()
 
     def add_layer(self):
         """
         Add the colorful layer based on the rank mode
         """
         if self.mode == 3:
-            df_temp = self.layer_func(self.dest, self.time)
+            df_temp = self.layer_func(self.dest, self.time, radius=self.radius)
+            self._gdf = link_to_gis(df_temp, zoom=self.zoom)
+            # Splice the layer into pre-serialized street geometries
+            layer_json = to_geojson(df_temp, zoom=self.zoom)
         elif self.mode in [1,2]:
-            df_temp = self.layer_func(self.time)
+            # A lookup in the precomputed time slots, the dataframe is only
+            # built if `gdf` is read
+            self._gdf = None
+            layer_json = slot_geojson(self.time, self.prop, zoom=self.zoom)
         else:
             return self
-        self.gdf = link_to_gis(df_temp)
 
         self.colormap.add_to(self)
         self.style_func = lambda x: {'color': self.colormap(x['properties'][self.prop]),
                                      'weight': 5}
 
-        folium.GeoJson(self.gdf.to_json(), style_function=self.style_func,
+        folium.GeoJson(layer_json, style_function=self.style_func,
                        name=self.prop).add_to(self)
 
         return self
-    
+
+    @property
+    def gdf(self):
+        """
+        The layer linked to GIS (empty before `add_layer`)
+        """
+        if self._gdf is None:
+            self._gdf = link_to_gis(self.layer_func(self.time), zoom=self.zoom)
+
+        return self._gdf
+
+    @gdf.setter
+    def gdf(self, gdf):
+        self._gdf = gdf
+
+    @property
+    def ev(self):
+        """
+        The EV charging stations drawn on the map, clustered if a zoom is
+        given (see `ev_clusters`)
+        """
+        if self.zoom is None:
+            return ev_layer()
+
+        return ev_clusters(self.zoom)
+
     def add_ev_charger(self):
         """
         Add EV charging stations layers
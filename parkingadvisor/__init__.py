@@ -1,3 +1,56 @@
-from .filter import *
-from .clean_up import *
-from .visual import *
+"""
+The names of `filter`, `clean_up` and `visual` are available from the
+package, but each module is only imported on the first access to one of
+its names, so e.g. `import parkingadvisor.filter` does not load folium.
+"""
+
+import importlib
+import importlib.util
+
+# The public names of each module, served from the package
+_EXPORTS = {
+    'filter': (
+        'DATA_PATH', 'EStation', 'EV_FILE', 'EV_ZOOM', 'FLOW_FILE', 'FLOW_RAW', 'FULL_ZOOM',
+        'GEOJSON_CACHE', 'GIS_FILE', 'INTERPOLATION_NUM', 'PACKAGE_NAME', 'PAYLOAD_FORMATS',
+        'PYRAMID_ZOOMS', 'RATE_FILE', 'RECOMM_CACHE', 'RECOMM_FACTOR', 'SLOT_CACHE', 'Street',
+        'TIME_SLOTS', 'build_pyramid', 'build_store', 'cached_recomm_layer', 'distance_df',
+        'ev_clusters', 'ev_layer', 'flow_file', 'flow_layer', 'flow_matrix', 'flow_slot',
+        'flow_streets', 'geometry_payload', 'layer_payload', 'link_to_gis', 'name_index',
+        'nearest_streets', 'open_shared', 'pixel_size', 'plot_flow', 'rate_cube',
+        'rate_day_type', 'rate_key', 'rate_layer', 'rate_splits', 'rate_streets', 'rate_table',
+        'rate_values', 'recomm_geojson', 'recomm_layer', 'recomm_layer_batch', 'recomm_scores',
+        'search_stations', 'search_streets', 'select_station', 'select_street', 'slot_geojson',
+        'slot_layers', 'slot_values', 'snap_dest', 'street_dictionary', 'street_dtype',
+        'street_geometry', 'street_ids', 'street_level', 'street_lines', 'street_points',
+        'street_rows', 'street_values', 'streets_in_bounds', 'streets_within', 'to_geojson',
+        'top_k_streets'
+    ),
+    'clean_up': (
+        'all_type', 'convert_datetime_to_h', 'convert_to_geojson', 'data_filter',
+        'ev_connector_tf', 'ev_level_tf', 'modify_end_time', 'read_data', 'subset'
+    ),
+    'visual': (
+        'MapLayer', 'color_bar', 'switch_layer'
+    ),
+}
+
+__all__ = sorted(name for names in _EXPORTS.values() for name in names)
+
+_MODULE_OF = {name: module_name for module_name, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name):
+    if name in _MODULE_OF:
+        module = importlib.import_module('.' + _MODULE_OF[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    # Submodules, e.g. `from . import dataset`
+    if not name.startswith('_') and importlib.util.find_spec('.' + name, __name__) is not None:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,83 @@
+"""
+This module contains the in-process cache for layer results, so repeated
+requests for the same destination and time are served from memory.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LayerCache():
+    """
+    The class `LayerCache` is a thread-safe LRU cache whose entries also
+    expire after a time-to-live.
+
+    Attributes:
+    ---------------------
+    maxsize:    The maximum number of entries
+    ttl:        The time-to-live of an entry (in second, None: never expire)
+    hits:       The number of lookups served from the cache
+    misses:     The number of lookups which computed the result
+    """
+
+    def __init__(self, maxsize=256, ttl=3600):
+        """
+        :param maxsize: The maximum number of entries
+        :type maxsize: int
+
+        :param ttl: The time-to-live of an entry (in second)
+        :type ttl: float
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Get the result of a key, computing and storing it on a miss
+
+        :param key: The hashable key of the result
+        :type key: tuple
+
+        :param compute: The function to compute the result, called without
+                        arguments
+        :type compute: function
+
+        :returns: The cached or computed result
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (self.ttl is None or now - item[0] < self.ttl):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        # Compute outside the lock so other keys are not blocked
+        value = compute()
+
+        with self._lock:
+            self._items[key] = (now, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        "Drop all entries and reset the counters"
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        "Get the hit/miss counters and the size of the cache"
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._items), 'maxsize': self.maxsize}
@@ -0,0 +1,394 @@
+"""
+This module keeps a process-wide registry of the datasets used by the
+layer functions, so that each file is parsed only once and shared by
+every later call until it changes on disk. Arrays derived from the
+datasets are saved as NumPy artifacts and memory-mapped on later runs.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+_REGISTRY = {}
+_LOCK = threading.Lock()
+_KEY_LOCKS = {}  # One lock per registry key, held while its data is built
+# The permissions of new files (read once, setting it is process-wide)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# The version of the artifact builders. Bump it (or pass `version` to
+# `artifact_file` for one artifact) whenever a builder changes, so the
+# files built by older code are not served anymore.
+ARTIFACT_VERSION = 1
+_VERSIONED = re.compile(r'^(?P<stem>.+)\.v\d+\.(?P<suffix>[^.]+)\.npy$')
+
+_PRUNED = set()  # Cache folders whose old versions have been removed
+_PRUNE_LOCK = threading.Lock()
+
+
+def _stamp(path):
+    """
+    Get the modification stamp of a file
+
+    :param path: The file path
+    :type path: str
+
+    :returns: The modification time (ns) and the size of the file
+    :rtype: tuple
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def version(*paths):
+    """
+    Get the version of dataset files, which changes whenever any of the
+    files changes on disk
+
+    :param paths: The dataset files
+    :type paths: str
+
+    :returns: The modification stamps of the files
+    :rtype: tuple
+    """
+    return tuple(_stamp(path) for path in paths)
+
+
+def _key_lock(key):
+    """
+    Get the lock of a registry key, so a slow read only blocks the callers
+    waiting for the same dataset. The lock is reentrant, as building one
+    dataset may load others.
+    """
+    with _LOCK:
+        return _KEY_LOCKS.setdefault(key, threading.RLock())
+
+
+def load(path, reader, **kwargs):
+    """
+    Load a dataset file through the registry. The file is read by `reader`
+    the first time and served from memory afterwards; it is read again
+    once its modification time or size changes.
+
+    NOTE
+        The returned object is shared by all callers. DataFrames are handed
+        out as shallow copies, so adding or dropping columns is safe, but
+        the values themselves must be treated as read-only.
+
+    :param path: The dataset file
+    :type path: str
+
+    :param reader: The function to read the file, called as
+                   `reader(path, **kwargs)` (e.g. `pd.read_csv`)
+    :type reader: function
+
+    :returns: The dataset read by `reader`
+    :rtype: dataframe
+    """
+    key = (os.path.abspath(path), reader,
+           tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    stamp = _stamp(path)
+
+    entry = _REGISTRY.get(key)
+    if entry is None or entry[0] != stamp:
+        with _key_lock(key):
+            entry = _REGISTRY.get(key)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, reader(path, **kwargs))
+                _REGISTRY[key] = entry
+
+    data = entry[1]
+    if isinstance(data, pd.DataFrame):
+        data = data.copy(deep=False)
+
+    return data
+
+
+def _write_file(path, write):
+    """
+    Write a file through a temporary file of its own in the same folder,
+    which then replaces `path` at once, so concurrent writers and readers
+    never see a partial file
+
+    :param path: The file
+    :type path: str
+
+    :param write: The function writing the content to the open binary file
+    :type write: function
+
+    :returns: Whether the file has been saved
+    :rtype: bool
+    """
+    try:
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        handle, temp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp')
+    except OSError:
+        return False
+
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            write(file)
+        # mkstemp only allows the owner to read
+        os.chmod(temp, 0o666 & ~_UMASK)
+        os.replace(temp, path)
+    except OSError:
+        if os.path.exists(temp):
+            os.remove(temp)
+        return False
+
+    return True
+
+
+def _save_array(path, array):
+    """
+    Save an array as .npy file, replacing any older file atomically
+
+    :param path: The artifact file
+    :type path: str
+
+    :param array: The array to save
+    :type array: array
+
+    :returns: Whether the array has been saved
+    :rtype: bool
+    """
+    return _write_file(path, lambda file: np.save(file, array))
+
+
+def save_file(path, data):
+    """
+    Save bytes to a file, replacing any older file atomically
+
+    :param path: The file
+    :type path: str
+
+    :param data: The content
+    :type data: bytes
+
+    :returns: Whether the file has been saved
+    :rtype: bool
+    """
+    return _write_file(path, lambda file: file.write(data))
+
+
+def artifact_file(source, suffix, version=ARTIFACT_VERSION):
+    """
+    The artifact file derived from a dataset file. Artifacts are kept in a
+    `build` folder next to the dataset, named with the version of their
+    builder (e.g. 'data/build/Streets_gis.v1.points.npy')
+
+    :param source: The dataset file
+    :type source: str
+
+    :param suffix: The name of the derived array
+    :type suffix: str
+
+    :param version: The version of the builder of the array
+    :type version: int
+
+    :returns: The artifact file
+    :rtype: str
+    """
+    folder, name = os.path.split(os.path.abspath(source))
+    stem = os.path.splitext(name)[0]
+    # Files generated into a build folder keep their artifacts beside them
+    if os.path.basename(folder) != 'build':
+        folder = os.path.join(folder, 'build')
+
+    return os.path.join(folder, '{}.v{}.{}.npy'.format(stem, version, suffix))
+
+
+def _remove_versions(path):
+    """
+    Remove the files of the other builder versions of an artifact, see
+    `artifact_file`
+
+    :param path: The artifact file
+    :type path: str
+    """
+    folder, name = os.path.split(os.path.abspath(path))
+    match = _VERSIONED.match(name)
+    if match is None:
+        return
+
+    for other in os.listdir(folder):
+        found = _VERSIONED.match(other)
+        if (other != name and found is not None
+                and found.group('stem', 'suffix') == match.group('stem', 'suffix')):
+            try:
+                os.remove(os.path.join(folder, other))
+            except OSError:
+                pass
+
+
+def prune_versions(cache_dir, version):
+    """
+    Remove the other versions from a cache folder holding one subfolder
+    per version (e.g. 'build/tiles/<version>/...'), once per folder and
+    version
+
+    :param cache_dir: The cache folder
+    :type cache_dir: str
+
+    :param version: The folder of the current version
+    :type version: str
+    """
+    with _PRUNE_LOCK:
+        if (cache_dir, version) in _PRUNED:
+            return
+        _PRUNED.add((cache_dir, version))
+
+    for name in os.listdir(cache_dir):
+        if name != version:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def artifact(path, sources, builder):
+    """
+    Load an array derived from dataset files. The array is memory-mapped
+    from the .npy file `path` when it is newer than all `sources`;
+    otherwise it is created by `builder` and saved to `path` first, and
+    the files of older builder versions are removed. If the folder is not
+    writable, the array is only kept in memory.
+
+    :param path: The artifact file (.npy)
+    :type path: str
+
+    :param sources: The dataset files the array is derived from
+    :type sources: list of str
+
+    :param builder: The function to create the array, called without
+                    arguments
+    :type builder: function
+
+    :returns: The read-only array
+    :rtype: array
+    """
+    key = (os.path.abspath(path), 'artifact')
+    stamps = tuple(_stamp(source) for source in sources)
+
+    entry = _REGISTRY.get(key)
+    if entry is None or entry[0] != stamps:
+        with _key_lock(key):
+            entry = _REGISTRY.get(key)
+            if entry is None or entry[0] != stamps:
+                newest = max(stamp[0] for stamp in stamps)
+                if not os.path.exists(path) or _stamp(path)[0] < newest:
+                    array = builder()
+                    if not _save_array(path, array):
+                        array.flags.writeable = False
+                        _REGISTRY[key] = (stamps, array)
+                        return array
+                    _remove_versions(path)
+                entry = (stamps, np.load(path, mmap_mode='r'))
+                _REGISTRY[key] = entry
+
+    return entry[1]
+
+
+class StringTable():
+    """
+    The class `StringTable` holds strings as one UTF-8 buffer and the
+    offset of each string in it, so a table saved as artifacts is
+    memory-mapped and shared between processes like any array.
+
+    Attributes:
+    ---------------------
+    data:       The UTF-8 bytes of all strings (uint8 array)
+    offsets:    The offset of the first byte of each string (n + 1)
+    """
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data, offsets):
+        """
+        :param data: The UTF-8 bytes of all strings
+        :type data: uint8 array
+
+        :param offsets: The offset of the first byte of each string (n + 1)
+        :type offsets: int64 array
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Build a table from strings
+
+        :param strings: The strings
+        :type strings: list of str
+
+        :returns: The table
+        :rtype: `StringTable`
+        """
+        encoded = [string.encode('utf8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(string) for string in encoded])
+
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf8')
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        "Decode all strings"
+        text = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return [text[start:end].decode('utf8') for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def string_artifact(path, sources, builder):
+    """
+    Load strings derived from dataset files as a memory-mapped
+    `StringTable`, see `artifact`. The offsets are saved next to the
+    strings (e.g. 'Streets_gis.v1.fragments.npy' and
+    'Streets_gis.v1.fragments_offsets.npy').
+
+    :param path: The artifact file of the strings (.npy)
+    :type path: str
+
+    :param sources: The dataset files the strings are derived from
+    :type sources: list of str
+
+    :param builder: The function to create the strings, called without
+                    arguments
+    :type builder: function
+
+    :returns: The read-only table
+    :rtype: `StringTable`
+    """
+    built = []
+
+    def build(part):
+        if not built:
+            built.append(StringTable.from_strings(builder()))
+        return getattr(built[0], part)
+
+    data = artifact(path, sources, lambda: build('data'))
+    offsets = artifact('{}_offsets.npy'.format(path[:-len('.npy')]), sources,
+                       lambda: build('offsets'))
+
+    return StringTable(np.asarray(data), np.asarray(offsets))
+
+
+def clear():
+    """
+    Drop every dataset held by the registry
+    """
+    with _LOCK:
+        _REGISTRY.clear()
@@ -0,0 +1,217 @@
+"""
+This module contains the occupancy (flow) data: the hourly occupancy of
+each street is smoothed into time slots of 0.1 hour, which are kept as a
+dense (streets x time slots) matrix.
+"""
+
+import os
+import threading
+
+import pandas as pd
+import numpy as np
+
+from . import dataset, store
+from .paths import DATA_PATH, FLOW_FILE, FLOW_RAW
+
+# Unless it is shipped as FLOW_FILE, the smoothed flow file is generated
+# into the build folder, or into the user cache folder if the package is
+# installed read-only
+_FLOW_BUILDS = (os.path.join(DATA_PATH, 'build', 'flow_all_streets.csv'),
+                os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                             'parkingadvisor', 'flow_all_streets.csv'))
+_FLOW_LOCK = threading.Lock()
+
+INTERPOLATION_NUM = 241
+TIME_SLOTS = np.linspace(0, 24, num=INTERPOLATION_NUM, endpoint=True)
+
+
+# Typed reader of the dataset shared through `dataset.load`
+def read_flow(file_time):
+    '''
+    Read the smoothed flow file with the street names as categories
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :returns: The entire smoothed flow dataframe
+    :rtype: dataframe
+    '''
+    d_entire = store.read_table(file_time,
+                                dtype={'TIME': np.float64, 'OCCUPANCY': np.float64})
+    d_entire['UNITDESC'] = d_entire['UNITDESC'].astype('category')
+
+    return d_entire
+
+
+# Calculations processing on clean datasets
+def _smooth_flow(file_flow=FLOW_RAW):
+    '''
+    Smooth the occupancy profiles of all streets at once. The hourly flow
+    is pivoted into a (streets x hours) array, and the streets sharing the
+    same observed hours are interpolated ('cubic') by a single spline
+    along the hour axis.
+
+    :param file_flow: The entire flow dataset file
+    :type file_flow: str
+
+    :returns: The street names (sorted) and the smoothed occupancy of each
+              street (rows) in each time slot (columns)
+    :rtype: tuple of array
+    '''
+    from scipy.interpolate import CubicSpline
+
+    df_flow = dataset.load(file_flow, store.read_table)
+    d_hour = df_flow.pivot_table(index='UNITDESC', columns='HOUR',
+                                 values='OCCUPANCY', aggfunc='mean')
+    hours = d_hour.columns.values.astype(np.float64)
+    occupancy = d_hour.values
+
+    t_new = TIME_SLOTS
+    flow = np.empty((occupancy.shape[0], INTERPOLATION_NUM))
+
+    # Group the streets by the hours with data
+    observed = ~np.isnan(occupancy)
+    patterns, group = np.unique(observed, axis=0, return_inverse=True)
+    group = group.ravel()
+    for i, pattern in enumerate(patterns):
+        rows = np.flatnonzero(group == i)
+        f_flow = CubicSpline(hours[pattern], occupancy[np.ix_(rows, pattern)],
+                             axis=1, extrapolate=True)
+        flow[rows] = f_flow(t_new)
+
+    np.maximum(flow, 0, out=flow)
+
+    return d_hour.index.values.astype(str), flow
+
+
+def _create_smooth_flow_file(file_flow=FLOW_RAW, file_out=FLOW_FILE):
+    '''
+    Generates the parking utilities of all streets by interpolation
+    and save a .csv file
+
+    :param file_flow: The entire flow dataset file
+    :type file_flow: str
+
+    :param file_out: The smoothed flow file to save
+                     (i.e. 'flow_all_streets.csv')
+    :type file_out: str
+
+    :returns: The entire flow dataset file
+    :rtype: dataframe
+    '''
+    names, flow = _smooth_flow(file_flow)
+
+    data_time = pd.DataFrame({'TIME': np.tile(TIME_SLOTS, len(names)),
+                              'OCCUPANCY': flow.ravel(),
+                              'UNITDESC': np.repeat(names, INTERPOLATION_NUM)})
+
+    # Save the smooth file, replacing any older file at once
+    if not dataset.save_file(file_out, data_time.to_csv().encode('utf8')):
+        raise OSError("Cannot write the smoothed flow file '{}'".format(file_out))
+
+    return data_time
+
+
+def flow_file(file_time):
+    '''
+    Get the smoothed flow file. Unless it exists, the default file is
+    generated from the raw flow file (i.e. 'Occupancy_per_hour.csv') into
+    the build folder, or into the user cache folder if the build folder is
+    not writable, and generated again once the raw file changes.
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :returns: The smoothed flow file
+    :rtype: str
+    '''
+    if os.path.exists(file_time) or os.path.abspath(file_time) != os.path.abspath(FLOW_FILE):
+        return file_time
+
+    with _FLOW_LOCK:
+        raw_time = os.stat(FLOW_RAW).st_mtime_ns
+        for path in _FLOW_BUILDS:
+            if os.path.exists(path) and os.stat(path).st_mtime_ns >= raw_time:
+                return path
+        for path in _FLOW_BUILDS:
+            try:
+                _create_smooth_flow_file(FLOW_RAW, path)
+            except OSError:
+                continue
+            return path
+
+    raise OSError("Cannot write the smoothed flow file to any of {}".format(_FLOW_BUILDS))
+
+
+def flow_slot(date_time):
+    """
+    Get the index of the smoothed flow time slot of a datetime, i.e. the
+    time rounded to 0.1 hour
+
+    :param date_time: The start time of parking
+    :type date_time: `datatime`
+
+    :returns: The index of the time slot (0 - 240)
+    :rtype: int
+    """
+    # Round the time decimal to 1 digit
+    time_float = date_time.hour + date_time.minute/60.0
+    time_float = round(time_float, 1)
+
+    return int(round(time_float * (INTERPOLATION_NUM - 1) / 24))
+
+
+def _build_flow_matrix(file_time):
+    """
+    Pivot the long-format smoothed flow file into a dense matrix
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :returns: The occupancy of each street (rows, sorted by name) in each
+              time slot (columns)
+    :rtype: float32 array
+    """
+    d_entire = dataset.load(file_time, read_flow)
+    rows = d_entire['UNITDESC'].cat.codes.values
+    cols = np.rint(d_entire['TIME'].values * (INTERPOLATION_NUM - 1) / 24).astype(int)
+
+    matrix = np.full((len(d_entire['UNITDESC'].cat.categories), INTERPOLATION_NUM),
+                     np.nan, dtype=np.float32)
+    matrix[rows, cols] = d_entire['OCCUPANCY'].values
+
+    return matrix
+
+
+def flow_matrix(file_time=FLOW_FILE):
+    """
+    Get the smoothed occupancy of all streets as a dense (streets x time
+    slots) matrix. It is built once from the smoothed flow file and
+    memory-mapped from 'data/build/' afterwards.
+
+    :param file_time: The smoothed flow file (i.e. 'flow_all_streets.csv')
+    :type file_time: str
+
+    :returns: The street names (sorted) and the float32 occupancy matrix,
+              whose column i is the time i/10 hour
+    :rtype: tuple of array
+    """
+    file_time = flow_file(file_time)
+    names = dataset.artifact(
+        dataset.artifact_file(file_time, 'streets'), [file_time],
+        lambda: np.array(dataset.load(file_time, read_flow)['UNITDESC'].cat.categories, dtype=str))
+    matrix = dataset.artifact(
+        dataset.artifact_file(file_time, 'occupancy'), [file_time],
+        lambda: _build_flow_matrix(file_time))
+
+    return names, matrix
+
+
+def flow_streets(file_time):
+    """
+    Get the street names of the flow matrix, see `flow_matrix`
+
+    :returns: The street names
+    :rtype: dict
+    """
+    return {'UNITDESC': flow_matrix(file_time)[0]}
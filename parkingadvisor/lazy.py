@@ -0,0 +1,50 @@
+"""
+This module defers importing heavy dependencies (e.g. geopandas, shapely)
+until they are first used, so importing the package stays fast for
+requests which never touch them.
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+_LOCK = threading.Lock()
+
+
+class _LazyModule(types.ModuleType):
+    """
+    The class `_LazyModule` stands for a module until one of its attributes
+    is read, which imports the module through the regular import system.
+    Concurrent first reads are safe: the import system runs the module
+    once and the other threads wait for it.
+    """
+
+    def __getattr__(self, attr):
+        # Only called for the attributes not copied from the module yet
+        with _LOCK:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    Import a module lazily: the module object is created at once, but its
+    code only runs on the first attribute access (e.g. `gpd.read_file`)
+
+    :param name: The full name of the module (e.g. 'geopandas')
+    :type name: str
+
+    :returns: The module
+    :rtype: module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    if importlib.util.find_spec(name) is None:
+        raise ImportError("No module named '{}'".format(name), name=name)
+
+    return _LazyModule(name)
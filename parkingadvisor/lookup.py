@@ -0,0 +1,144 @@
+"""
+This module indexes the names of a dataset (e.g. street or station names),
+so a row is found by its name in constant time instead of comparing the
+name with every row, and names are searched by prefix for autocomplete.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from . import dataset
+
+
+def normalize_name(name):
+    """
+    Normalize a name for lookups: case-folded, with single spaces and no
+    leading or trailing spaces (e.g. ' 10th  Ave ' -> '10th ave')
+
+    :param name: The name
+    :type name: str
+
+    :returns: The lookup key of the name
+    :rtype: str
+    """
+    return ' '.join(str(name).split()).casefold()
+
+
+class NameIndex():
+    """
+    The class `NameIndex` maps the normalized names of a column to the
+    positions of their rows. Names which only differ in case or spaces
+    share one key.
+
+    Attributes:
+    ---------------------
+    size:   The number of distinct keys
+    """
+
+    def __init__(self, names):
+        """
+        :param names: The name of each row (missing names are skipped)
+        :type names: array-like
+        """
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        order = np.argsort(codes, kind='stable')
+        starts = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+        self._rows = {}
+        self._names = {}
+        for code, name in enumerate(uniques):
+            key = normalize_name(name)
+            rows = order[starts[code]:starts[code + 1]]
+            if key in self._rows:
+                rows = np.sort(np.concatenate([self._rows[key], rows]))
+            else:
+                self._names[key] = name
+            self._rows[key] = rows
+        for rows in self._rows.values():
+            rows.flags.writeable = False
+
+        self._keys = sorted(self._rows)
+        self.size = len(self._keys)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._rows
+
+    def rows(self, name):
+        """
+        Find the rows of a name
+
+        :param name: The name, in any case or spacing
+        :type name: str
+
+        :returns: The positions of the rows, in ascending order (empty if
+                  the name is unknown)
+        :rtype: array of int
+        """
+        return self._rows.get(normalize_name(name), np.array([], dtype=np.int64))
+
+    def name(self, name):
+        """
+        Get the name as written in the dataset
+
+        :param name: The name, in any case or spacing
+        :type name: str
+
+        :returns: The name of the first row (None if the name is unknown)
+        :rtype: str
+        """
+        return self._names.get(normalize_name(name))
+
+    def prefix(self, text, limit=10):
+        """
+        Find the names starting with a text, e.g. for autocomplete
+
+        :param text: The start of the name, in any case or spacing
+        :type text: str
+
+        :param limit: The maximum number of names (None: all)
+        :type limit: int
+
+        :returns: The names as written in the dataset, in alphabetical order
+        :rtype: list of str
+        """
+        text = normalize_name(text)
+        found = []
+        for i in range(bisect_left(self._keys, text), self.size):
+            if not self._keys[i].startswith(text) or (limit is not None and len(found) >= limit):
+                break
+            found.append(self._names[self._keys[i]])
+
+        return found
+
+
+def _name_index(path, file_reader, column):
+    """
+    Index the names of a column of a dataset file, see `NameIndex`
+
+    :returns: The name index
+    :rtype: `NameIndex`
+    """
+    return NameIndex(dataset.load(path, file_reader)[column])
+
+
+def name_index(path, reader, column):
+    """
+    Get the index of the names of a column of a dataset file. The index is
+    built once per dataset and kept until the file changes on disk.
+
+    :param path: The dataset file
+    :type path: str
+
+    :param reader: The function to read the file, see `dataset.load`
+    :type reader: function
+
+    :param column: The name column (e.g. 'UNITDESC' or 'Station Name')
+    :type column: str
+
+    :returns: The name index, whose rows are positions in
+              `dataset.load(path, reader)`
+    :rtype: `NameIndex`
+    """
+    return dataset.load(path, _name_index, file_reader=reader, column=column)
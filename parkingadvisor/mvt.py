@@ -0,0 +1,213 @@
+"""
+This module encodes Mapbox Vector Tiles (MVT, version 2) of street lines.
+The protobuf messages are written by hand, as only the line geometry and
+scalar attributes are needed.
+
+NOTE
+    Tile  -- layers (3)
+    Layer -- version (15), name (1), features (2), keys (3), values (4),
+             extent (5)
+    Feature -- id (1), tags (2, packed), type (3), geometry (4, packed)
+    Value -- string (1), double (3), sint (6), bool (7)
+"""
+
+import struct
+
+import numpy as np
+
+
+EXTENT = 4096
+LINESTRING = 2
+
+_VARINT = 0
+_FIXED64 = 1
+_BYTES = 2
+
+
+def tile_bounds(z, x, y):
+    """
+    Get the bounding box of a web mercator tile
+
+    :param z, x, y: The zoom level and the column and row of the tile
+    :type z, x, y: int
+
+    :returns: The bounding box (min long, min lat, max long, max lat)
+    :rtype: tuple
+    """
+    n = 2 ** z
+
+    def lat(row):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n)))))
+
+    return (x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y))
+
+
+def pixel_size(zoom):
+    """
+    Get the size of a screen pixel at a map zoom (degree of longitude)
+
+    :param zoom: The map zoom
+    :type zoom: int
+
+    :returns: The pixel size
+    :rtype: float
+    """
+    return 360.0 / 256 / 2 ** zoom
+
+
+def project(coords, z, x, y, extent=EXTENT):
+    """
+    Project (long, lat) coordinates to the integer grid of a tile, whose
+    origin is the top-left corner of the tile
+
+    :param coords: The coordinates (n x 2) in (long, lat)
+    :type coords: array
+
+    :param z, x, y: The zoom level and the column and row of the tile
+    :type z, x, y: int
+
+    :param extent: The size of the tile grid
+    :type extent: int
+
+    :returns: The tile coordinates (n x 2)
+    :rtype: float array
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    n = 2 ** z
+    lat = np.radians(coords[:, 1])
+    col = (coords[:, 0] + 180) / 360 * n
+    row = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * n
+
+    return np.stack([(col - x) * extent, (row - y) * extent], axis=-1)
+
+
+def _varint(value):
+    "Encode an unsigned integer as a protobuf varint"
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    "Map signed integers to unsigned ones (0, -1, 1, -2 -> 0, 1, 2, 3)"
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    "Encode a field key"
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field, data):
+    "Encode a length-delimited field"
+    return _key(field, _BYTES) + _varint(len(data)) + data
+
+
+def _packed_field(field, values):
+    "Encode a packed repeated uint32 field"
+    values = [int(value) for value in values]
+    if max(values, default=0) < 0x80:
+        return _bytes_field(field, bytes(values))
+    return _bytes_field(field, b''.join(_varint(value) for value in values))
+
+
+def _value(value):
+    "Encode a Value message"
+    if isinstance(value, (bool, np.bool_)):
+        return _key(7, _VARINT) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        return _key(6, _VARINT) + _varint(_zigzag(int(value)))
+    if isinstance(value, (float, np.floating)):
+        return _key(3, _FIXED64) + struct.pack('<d', value)
+    return _bytes_field(1, str(value).encode('utf8'))
+
+
+def line_geometry(lines):
+    """
+    Encode lines as MVT geometry commands. Repeated points are dropped and
+    lines left with less than two points are skipped.
+
+    :param lines: The integer tile coordinates of each line (n x 2)
+    :type lines: list of array
+
+    :returns: The command integers (MoveTo, LineTo with zigzag deltas)
+    :rtype: int64 array
+    """
+    commands = []
+    cursor = np.zeros((1, 2), dtype=np.int64)
+    for line in lines:
+        line = np.asarray(line, dtype=np.int64).reshape(-1, 2)
+        if len(line):
+            line = line[np.r_[True, np.any(np.diff(line, axis=0), axis=1)]]
+        if len(line) < 2:
+            continue
+
+        params = _zigzag(np.diff(line, axis=0, prepend=cursor)).ravel()
+        commands += [[1 | (1 << 3)], params[:2], [2 | ((len(line) - 1) << 3)], params[2:]]
+        cursor = line[-1:]
+
+    return np.concatenate(commands) if commands else np.zeros(0, dtype=np.int64)
+
+
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Encode a layer of line features
+
+    :param name: The layer name
+    :type name: str
+
+    :param features: The features as (id, attributes, lines), lines being
+                     a list of integer tile coordinates (n x 2). Features
+                     without any line left are skipped.
+    :type features: list of tuple
+
+    :param extent: The size of the tile grid
+    :type extent: int
+
+    :returns: The Layer message
+    :rtype: bytes
+    """
+    keys, values = {}, {}
+    messages = []
+    for feature_id, attributes, lines in features:
+        geometry = line_geometry(lines)
+        if not len(geometry):
+            continue
+
+        tags = []
+        for key, value in attributes.items():
+            if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value).__name__, value), len(values)))
+
+        message = (_key(1, _VARINT) + _varint(int(feature_id))
+                   + _packed_field(2, tags)
+                   + _key(3, _VARINT) + _varint(LINESTRING)
+                   + _packed_field(4, geometry))
+        messages.append(_bytes_field(2, message))
+
+    layer = (_key(15, _VARINT) + _varint(2)
+             + _bytes_field(1, name.encode('utf8'))
+             + b''.join(messages)
+             + b''.join(_bytes_field(3, key.encode('utf8')) for key in keys)
+             + b''.join(_bytes_field(4, _value(value)) for _, value in values)
+             + _key(5, _VARINT) + _varint(extent))
+
+    return layer
+
+
+def encode_tile(layers):
+    """
+    Encode a tile
+
+    :param layers: The Layer messages, see `encode_layer`
+    :type layers: list of bytes
+
+    :returns: The Tile message
+    :rtype: bytes
+    """
+    return b''.join(_bytes_field(3, layer) for layer in layers)
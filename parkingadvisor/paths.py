@@ -0,0 +1,20 @@
+"""
+This module locates the dataset files shipped with the package.
+"""
+
+import os
+import sys
+from importlib import resources
+
+if sys.modules[__package__].__spec__.origin is None:
+    # A namespace package (e.g. the vendored copy of the Django app), which
+    # resources.files does not support before Python 3.10
+    DATA_PATH = os.path.join(os.path.dirname(__file__), 'data', '')
+else:
+    DATA_PATH = os.path.join(str(resources.files(__package__) / 'data'), '')
+
+RATE_FILE = DATA_PATH + 'Rate_limit.csv'
+FLOW_RAW = DATA_PATH + 'Occupancy_per_hour.csv'
+FLOW_FILE = DATA_PATH + 'flow_all_streets.csv'
+GIS_FILE = DATA_PATH + 'Streets_gis.json'
+EV_FILE = DATA_PATH + 'EV Charger.json'
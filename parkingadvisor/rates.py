@@ -0,0 +1,277 @@
+"""
+This module contains the parking rate data: the rate sections of each
+street are resolved into a (day type x hour x street) cube, and rate
+sections starting inside an hour are resolved to the minute.
+"""
+
+import pandas as pd
+import numpy as np
+
+from . import dataset, store
+from .paths import RATE_FILE
+
+
+# Typed reader of the dataset shared through `dataset.load`
+def read_rate(file_rate, columns=None):
+    '''
+    Read the rate file with all rates and key timepoints as floats
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :param columns: The columns to read, with 'UNITDESC' (None: all)
+    :type columns: list of str
+
+    :returns: The entire rate dataframe
+    :rtype: dataframe
+    '''
+    raw = store.read_table(file_rate, columns)
+    cols = raw.columns.drop('UNITDESC')
+    raw[cols] = raw[cols].astype(np.float64)
+
+    return raw
+
+
+def _loc_period(df_selected_day, hour):
+    """
+    Determine the given hour number in which time section
+    and get the corresponding rate.
+    NOTE
+        -----------time1--------time2--------time3----------time4(n)----------
+        |----SEC0----|----SEC1----|----SEC2---|-----SEC3-----|----SEC4----|
+                     |   --------------input---------------  |
+
+    The section of every street is resolved at once: it is the number of
+    key timepoints not later than the hour. SEC0 and the last section are
+    free. The given dataframe is not modified.
+
+    :param df_selected_day: the rate info dataframe with columns [key timepoint (n), rate_list (n-1)] 
+                            for each section
+    :type df_selected_day: dataframe
+
+    :param hour: the number of datetime hour
+    :type hour: int
+
+    :returns: the rate for all streets at the given time
+    :rtype: dataframe
+    """
+    if 'SEC0' in df_selected_day.columns:
+        # Drop the free time region columns inserted before
+        df_selected_day = df_selected_day.drop(['SEC0', 'LAST_SEC'], axis=1)
+    # Get the key timepoint number
+    n_time = int(df_selected_day.shape[1] / 2)
+
+    # Missing timepoints never start a section
+    timepoints = df_selected_day.iloc[:, 1:n_time + 1].values.astype(np.float64)
+    timepoints[np.isnan(timepoints)] = np.inf
+
+    # Count the timepoints not later than the hour, which refers to the
+    # section num (e.g. [8, 11, 17, 20] and hour=8: sec = 1. So in SEC1)
+    sec = (timepoints <= hour).sum(axis=1)
+
+    # Rates of [SEC0, SEC1, ..., LAST_SEC], missing rates are free
+    rates = np.zeros((timepoints.shape[0], n_time + 1))
+    rates[:, 1:n_time] = df_selected_day.iloc[:, n_time + 1:].values.astype(np.float64)
+    rates[np.isnan(rates)] = 0
+
+    df_rate = pd.DataFrame({'UNITDESC': df_selected_day['UNITDESC'].values,
+                            'RATE': rates[np.arange(rates.shape[0]), sec]})
+
+    return df_rate
+
+
+def rate_day_type(date_time):
+    """
+    Get the rate day type of a datetime
+
+    :param date_time: the start time of parking
+    :type date_time: `datatime`
+
+    :returns: 0 -- Weekday, 1 -- Saturday, 2 -- Sunday
+    :rtype: int
+    """
+    day = date_time.isoweekday()
+
+    return {6: 1, 7: 2}.get(day, 0)
+
+
+def _rate_columns(day_type):
+    """
+    Get the rate columns [UNITDESC, key timepoints (4), rates (3)] of a day type
+
+    :param day_type: 0 -- Weekday, 1 -- Saturday
+    :type day_type: int
+
+    :returns: The column names
+    :rtype: list
+    """
+    day = ('WKD', 'SAT')[day_type]
+
+    return (['UNITDESC'] + [day + col for col in ('_START1', '_END1', '_END2', '_END3')]
+            + [day + '_RATE{}'.format(i) for i in (1, 2, 3)])
+
+
+def _build_rate_cube(file_rate):
+    """
+    Resolve the rates of all streets for every day type and hour
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The rate of each day type, hour and street (3 x 24 x n_street)
+    :rtype: float32 array
+    """
+    raw = dataset.load(file_rate, read_rate)
+
+    # SUN - free
+    cube = np.zeros((3, 24, raw.shape[0]), dtype=np.float32)
+    for day_type in (0, 1):
+        df_day = raw.loc[:, _rate_columns(day_type)]
+        for hour in range(24):
+            cube[day_type, hour] = _loc_period(df_day, hour)['RATE'].values
+
+    return cube
+
+
+def _build_rate_splits(file_rate):
+    """
+    Find the streets with a rate section starting inside an hour (e.g. 8:30),
+    whose rate changes within the hour
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: Whether the rate of each street changes within each hour of
+              each day type (3 x 24 x n_street)
+    :rtype: bool array
+    """
+    raw = dataset.load(file_rate, read_rate)
+
+    splits = np.zeros((3, 24, raw.shape[0]), dtype=bool)
+    for day_type in (0, 1):
+        timepoints = raw.loc[:, _rate_columns(day_type)[1:5]].values
+        for hour in range(24):
+            splits[day_type, hour] = ((timepoints > hour) & (timepoints < hour + 1)).any(axis=1)
+
+    return splits
+
+
+def rate_splits(file_rate):
+    """
+    Get the streets whose rate changes within each hour, see
+    `_build_rate_splits`. Memory-mapped from 'data/build/'.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The split flags (3 x 24 x n_street)
+    :rtype: bool array
+    """
+    return dataset.artifact(dataset.artifact_file(file_rate, 'rate_splits'), [file_rate],
+                            lambda: _build_rate_splits(file_rate))
+
+
+def rate_cube(file_rate=RATE_FILE):
+    """
+    Get the rates of all streets as a (day type x hour x street) cube. It
+    is built once from the rate file and memory-mapped from 'data/build/'
+    afterwards.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The street names (in the file order) and the float32 rate
+              cube. Day types: 0 -- Weekday, 1 -- Saturday, 2 -- Sunday
+    :rtype: tuple of array
+    """
+    names = dataset.artifact(
+        dataset.artifact_file(file_rate, 'streets'), [file_rate],
+        lambda: np.array(dataset.load(file_rate, read_rate)['UNITDESC'], dtype=str))
+    cube = dataset.artifact(
+        dataset.artifact_file(file_rate, 'rate'), [file_rate],
+        lambda: _build_rate_cube(file_rate))
+
+    return names, cube
+
+
+def rate_streets(file_rate):
+    """
+    Get the street names of the rate file, see `rate_cube`
+
+    :returns: The street names
+    :rtype: dict
+    """
+    return {'UNITDESC': rate_cube(file_rate)[0]}
+
+
+def rate_table(file_rate):
+    """
+    Get all rates and key timepoints of the rate file as a (street x
+    column) matrix, in the order of the file columns after 'UNITDESC'.
+    Memory-mapped from 'data/build/'.
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The float64 matrix
+    :rtype: array
+    """
+    return np.asarray(dataset.artifact(
+        dataset.artifact_file(file_rate, 'rate_table'), [file_rate],
+        lambda: dataset.load(file_rate, read_rate).drop(columns='UNITDESC').values))
+
+
+def rate_values(date_time, file_rate=RATE_FILE):
+    """
+    Get the parking rate of all streets (in the rate file order) at a
+    specific datetime, see `filter.rate_layer`
+
+    :param date_time: the start time of parking
+    :type date_time: `datatime`
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The rate of each street
+    :rtype: float64 array
+    """
+    day_type = rate_day_type(date_time)
+    hour = date_time.hour
+
+    rate = rate_cube(file_rate)[1][day_type, hour].astype(np.float64)
+
+    # Resolve the sections starting inside the hour to the minute
+    if date_time.minute:
+        splits = rate_splits(file_rate)[day_type, hour]
+        if splits.any():
+            # Only the columns of the day type are read
+            columns = _rate_columns(day_type)
+            raw = dataset.load(file_rate, read_rate, columns=columns)
+            df_split = _loc_period(raw.loc[splits, columns],
+                                   hour + date_time.minute / 60.0)
+            rate[splits] = df_split['RATE'].values
+
+    return rate
+
+
+def rate_key(date_time, file_rate=RATE_FILE):
+    """
+    Get the key of the rates at a datetime: two datetimes with the same key
+    have the same rate on every street
+
+    :param date_time: the start time of parking
+    :type date_time: `datatime`
+
+    :param file_rate: The entire rate file (i.e. 'Rate_limit.csv')
+    :type file_rate: str
+
+    :returns: The day type, hour, and minute (0 unless a rate section
+              starts inside the hour)
+    :rtype: tuple
+    """
+    day_type = rate_day_type(date_time)
+    hour = date_time.hour
+    # The minute only matters for rate sections starting inside the hour
+    minute = date_time.minute if rate_splits(file_rate)[day_type, hour].any() else 0
+
+    return day_type, hour, minute
@@ -0,0 +1,150 @@
+"""
+This module keeps columnar copies of the datasets: CSV tables as Parquet
+and GeoJSON layers as GeoParquet (WKB geometry), in the `build` folder
+next to each dataset. The readers use the copy when it is newer than the
+original file and pyarrow is installed, and read the original file
+otherwise, so the copies are only an optimization.
+
+NOTE
+    The CSV datasets are written with their index as first column (i.e.
+    read by `pd.read_csv(path, index_col=0)`).
+"""
+
+import importlib.util
+import io
+import os
+
+import pandas as pd
+
+from . import dataset
+from .lazy import lazy_import
+
+gpd = lazy_import('geopandas')
+
+
+def has_parquet():
+    """
+    Whether Parquet files can be read and written (pyarrow is installed)
+
+    :rtype: bool
+    """
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def parquet_file(source):
+    """
+    The columnar copy of a dataset file (e.g. 'data/build/Rate_limit.parquet')
+
+    :param source: The dataset file
+    :type source: str
+
+    :returns: The Parquet file
+    :rtype: str
+    """
+    folder, name = os.path.split(os.path.abspath(source))
+    if os.path.basename(folder) != 'build':
+        folder = os.path.join(folder, 'build')
+
+    return os.path.join(folder, os.path.splitext(name)[0] + '.parquet')
+
+
+def _fresh_copy(source):
+    """
+    Get the columnar copy of a dataset file if it can be used
+
+    :returns: The Parquet file (None: read the original file)
+    :rtype: str
+    """
+    path = parquet_file(source)
+    if (os.path.exists(path) and os.stat(path).st_mtime_ns >= os.stat(source).st_mtime_ns
+            and has_parquet()):
+        return path
+
+    return None
+
+
+def _is_geo(source):
+    "Whether a dataset file is a GeoJSON layer"
+    return os.path.splitext(source)[1].lower() in ('.json', '.geojson')
+
+
+def convert(source):
+    """
+    Write the columnar copy of a dataset file
+
+    :param source: The dataset file (CSV or GeoJSON)
+    :type source: str
+
+    :returns: The Parquet file
+    :rtype: str
+
+    :raises OSError: If the `build` folder is not writable
+    """
+    if not has_parquet():
+        raise ImportError("Converting datasets to Parquet needs pyarrow", name='pyarrow')
+
+    path = parquet_file(source)
+    if _is_geo(source):
+        frame = gpd.read_file(source)
+    else:
+        frame = pd.read_csv(source, index_col=0)
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, compression='zstd')
+    # Concurrent writers each write a file of their own, see `dataset.save_file`
+    if not dataset.save_file(path, buffer.getvalue()):
+        raise OSError("Cannot write the columnar copy '{}'".format(path))
+
+    return path
+
+
+def read_table(source, columns=None, **kwargs):
+    """
+    Read a CSV dataset, from its columnar copy if possible
+
+    :param source: The CSV file
+    :type source: str
+
+    :param columns: The columns to read (None: all)
+    :type columns: list of str
+
+    :param kwargs: More arguments of `pd.read_csv`, used when the original
+                   file is read (e.g. dtype)
+
+    :returns: The dataset
+    :rtype: dataframe
+    """
+    path = _fresh_copy(source)
+    if path is not None:
+        return pd.read_parquet(path, columns=columns)
+
+    if columns is not None:
+        # Keep the index column, whose header is empty
+        wanted = set(columns)
+        kwargs['usecols'] = lambda column: column in wanted or column.startswith('Unnamed: 0')
+
+    return pd.read_csv(source, index_col=0, **kwargs)
+
+
+def read_geo(source, columns=None):
+    """
+    Read a GeoJSON layer, from its columnar copy if possible
+
+    :param source: The GeoJSON file
+    :type source: str
+
+    :param columns: The property columns to read besides the geometry
+                    (None: all)
+    :type columns: list of str
+
+    :returns: The layer
+    :rtype: GeoPandas.DataFrame
+    """
+    path = _fresh_copy(source)
+    if path is not None:
+        return gpd.read_parquet(path, columns=None if columns is None else list(columns) + ['geometry'])
+
+    gdf = gpd.read_file(source)
+    if columns is not None:
+        gdf = gdf[list(columns) + ['geometry']]
+
+    return gdf
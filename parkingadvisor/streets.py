@@ -0,0 +1,334 @@
+"""
+This module builds the reference points of all street lines from the
+street GeoJSON file (i.e. Streets_gis.json), so the layer functions never
+need to access the line geometry to locate a street.
+"""
+
+import json
+
+import numpy as np
+
+from . import store
+from .geodesy import EARTH_RADIUS, KM_TO_MILES, haversine
+from .lazy import lazy_import
+
+shapely = lazy_import('shapely')
+
+
+def _point_dtype(name_len):
+    """
+    The record layout of street reference points
+
+    :param name_len: The maximum length of the street names
+    :type name_len: int
+
+    :returns: The dtype of the records
+    :rtype: numpy.dtype
+    """
+    return np.dtype([('UNITDESC', 'U{}'.format(name_len)),
+                     ('MID_LAT', 'f8'), ('MID_LON', 'f8'),
+                     ('CEN_LAT', 'f8'), ('CEN_LON', 'f8'),
+                     ('MIN_LAT', 'f8'), ('MIN_LON', 'f8'),
+                     ('MAX_LAT', 'f8'), ('MAX_LON', 'f8'),
+                     ('LENGTH', 'f8')])
+
+
+def _read_geometry(street_geojson):
+    """
+    Read the street names and line geometries of a GeoJSON file, from its
+    columnar copy if possible (see `store.read_geo`)
+
+    :returns: The street names and lines
+    :rtype: tuple of array
+    """
+    gdf = store.read_geo(street_geojson, ['UNITDESC'])
+
+    return gdf['UNITDESC'].values.astype(str), gdf.geometry.to_numpy()
+
+
+def read_lines(street_geojson):
+    """
+    Read the street names and line vertices from a GeoJSON file into
+    one flat coordinate buffer. The parts of multi-lines are joined, which
+    only suits the reference points (see `build_points`); the geometry
+    itself is read by `read_parts`.
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The street names, vertex coordinates (n_vertex, 2) in
+              (long, lat), and the offset of the first vertex of each street
+              (n_street + 1)
+    :rtype: tuple of array
+    """
+    names, lines = _read_geometry(street_geojson)
+    coords, street = shapely.get_coordinates(lines, return_index=True)
+
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(street, minlength=len(lines)))
+
+    return names, coords, offsets
+
+
+def _split_parts(lines):
+    """
+    Split line geometries into the flat buffers of their parts, see
+    `read_parts`
+
+    :returns: The vertex coordinates, the part offsets, the street offsets
+              and the multi-line flags
+    :rtype: tuple of array
+    """
+    parts, street = shapely.get_parts(lines, return_index=True)
+    coords, part = shapely.get_coordinates(parts, return_index=True)
+
+    part_offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    part_offsets[1:] = np.cumsum(np.bincount(part, minlength=len(parts)))
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(street, minlength=len(lines)))
+    multi = shapely.get_type_id(lines) == 5  # MultiLineString
+
+    return coords, part_offsets, offsets, multi
+
+
+def read_parts(street_geojson):
+    """
+    Read the line vertices of all streets from a GeoJSON file into one
+    flat coordinate buffer, keeping the parts of multi-lines
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The vertex coordinates (n_vertex, 2) in (long, lat), the
+              offset of the first vertex of each part (n_part + 1), the
+              offset of the first part of each street (n_street + 1), and
+              whether each street is a multi-line
+    :rtype: tuple of array
+    """
+    return _split_parts(_read_geometry(street_geojson)[1])
+
+
+def build_lines(coords, part_offsets, offsets, multi):
+    """
+    Create the line geometries of all streets from their flat buffers,
+    see `read_parts`
+
+    :returns: The line of each street
+    :rtype: array of shapely geometries
+    """
+    parts = shapely.linestrings(coords, indices=np.repeat(np.arange(len(part_offsets) - 1),
+                                                          np.diff(part_offsets)))
+    lines = parts[offsets[:-1]]
+    if multi.any():
+        street = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        in_multi = multi[street]
+        lines[multi] = shapely.multilinestrings(parts[in_multi],
+                                                indices=np.unique(street[in_multi],
+                                                                  return_inverse=True)[1])
+
+    return lines
+
+
+def line_fragments(coords, part_offsets, offsets, multi):
+    """
+    Serialize the geometry of each street as GeoJSON text from their flat
+    buffers, see `read_parts`
+
+    :returns: The JSON text of each street geometry
+    :rtype: list of str
+    """
+    coords = np.asarray(coords).tolist()
+    parts = [coords[start:end] for start, end in zip(part_offsets[:-1], part_offsets[1:])]
+
+    fragments = []
+    for start, end, is_multi in zip(offsets[:-1], offsets[1:], multi):
+        if is_multi:
+            geometry = {'type': 'MultiLineString', 'coordinates': parts[start:end]}
+        else:
+            geometry = {'type': 'LineString', 'coordinates': parts[start]}
+        fragments.append(json.dumps(geometry))
+
+    return fragments
+
+
+def simplify_lines(coords, offsets, tolerance, decimals):
+    """
+    Simplify all lines by the Douglas-Peucker algorithm and round their
+    coordinates, e.g. for drawing the streets at a low map zoom
+
+    :param coords: The vertex coordinates (n_vertex, 2), see `read_parts`
+    :type coords: array
+
+    :param offsets: The offset of the first vertex of each line (n_line + 1),
+                    i.e. of each part of the streets
+    :type offsets: array
+
+    :param tolerance: The largest distance of a dropped vertex to the
+                      simplified line (degree)
+    :type tolerance: float
+
+    :param decimals: The number of decimals of the coordinates
+    :type decimals: int
+
+    :returns: The simplified coordinates and offsets, with the end points
+              of every line kept
+    :rtype: tuple of array
+    """
+    lines = shapely.linestrings(coords, indices=np.repeat(np.arange(len(offsets) - 1),
+                                                          np.diff(offsets)))
+    lines = shapely.simplify(lines, tolerance, preserve_topology=False)
+    simple, index = shapely.get_coordinates(lines, return_index=True)
+
+    simple_offsets = np.zeros(len(offsets), dtype=np.int64)
+    simple_offsets[1:] = np.cumsum(np.bincount(index, minlength=len(offsets) - 1))
+
+    return np.round(simple, decimals), simple_offsets
+
+
+def read_fragments(street_geojson):
+    """
+    Read the street names and serialize the geometry of each street once,
+    so GeoJSON responses can splice the geometry text instead of encoding
+    the coordinates again
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The street names and the JSON text of their geometries
+    :rtype: tuple of list
+    """
+    names, lines = _read_geometry(street_geojson)
+
+    return names.tolist(), line_fragments(*_split_parts(lines))
+
+
+def build_points(street_geojson):
+    """
+    Calculates the reference points of all streets
+
+    NOTE
+        MID  -- The point halfway along the line
+        CEN  -- The length-weighted centroid of the line
+        MIN/MAX -- The bounding box of the line
+        LENGTH -- The length of the line (mile)
+
+    :param street_geojson: The GeoJSON file of all streets (i.e. Streets_gis.json)
+    :type street_geojson: str
+
+    :returns: The reference points of each street, in the order of the file
+    :rtype: numpy record array
+    """
+    names, coords, offsets = read_lines(street_geojson)
+    starts, ends = offsets[:-1], offsets[1:]
+
+    # Segments between consecutive vertices of the same street
+    seg_start = coords[:-1]
+    seg_end = coords[1:]
+    seg_len = haversine(seg_start[:, 1], seg_start[:, 0],
+                        seg_end[:, 1], seg_end[:, 0])
+    # Drop the segments joining the last vertex of a street to the next one
+    seg_len[ends[:-1] - 1] = 0
+
+    # Cumulative length at each vertex, restarting on every street
+    cum_len = np.concatenate([[0], np.cumsum(seg_len)])
+    cum_len -= np.repeat(cum_len[starts], ends - starts)
+    length = cum_len[ends - 1]
+
+    # Midpoint: interpolate on the segment which crosses half the length
+    half = length / 2
+    below = cum_len < np.repeat(half, ends - starts)
+    seg_idx = starts + np.add.reduceat(below, starts)
+    seg_idx = np.clip(seg_idx, starts + 1, ends - 1)
+    before, after = cum_len[seg_idx - 1], cum_len[seg_idx]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.where(after > before, (half - before) / (after - before), 0.5)
+    mid = coords[seg_idx - 1] + frac[:, None] * (coords[seg_idx] - coords[seg_idx - 1])
+
+    # Centroid: segment midpoints weighted by segment length
+    seg_mid = (seg_start + seg_end) / 2 * seg_len[:, None]
+    weighted = np.add.reduceat(np.vstack([seg_mid, [[0, 0]]]), starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cen = np.where(length[:, None] > 0, weighted / length[:, None], mid)
+
+    points = np.zeros(len(names), dtype=_point_dtype(max(map(len, names))))
+    points['UNITDESC'] = names
+    points['MID_LAT'], points['MID_LON'] = mid[:, 1], mid[:, 0]
+    points['CEN_LAT'], points['CEN_LON'] = cen[:, 1], cen[:, 0]
+    points['MIN_LAT'] = np.minimum.reduceat(coords[:, 1], starts)
+    points['MIN_LON'] = np.minimum.reduceat(coords[:, 0], starts)
+    points['MAX_LAT'] = np.maximum.reduceat(coords[:, 1], starts)
+    points['MAX_LON'] = np.maximum.reduceat(coords[:, 0], starts)
+    points['LENGTH'] = length
+
+    return points
+
+
+class PointIndex():
+    """
+    The class `PointIndex` is a KD-tree over street reference points for
+    nearest and radius queries. The points are projected to a local plane
+    (equirectangular, in mile) around their mean latitude.
+
+    NOTE
+        The projected distance is within 1 % of the geodesic distance over
+        a city, so the queries return candidates within a 2 % margin and the
+        caller measures the exact distance of the candidates.
+    """
+
+    MARGIN = 0.02
+
+    def __init__(self, lat, lon):
+        """
+        :param lat, lon: The latitudes and longitudes of the points
+        :type lat, lon: array
+        """
+        from scipy.spatial import cKDTree
+
+        self._lat0 = np.radians(np.mean(lat))
+        self._tree = cKDTree(self._project(lat, lon))
+        self.size = len(lat)
+
+    def _project(self, lat, lon):
+        "Project (lat, long) in degree to plane coordinates in mile"
+        radius = EARTH_RADIUS * KM_TO_MILES
+        lat = np.radians(np.asarray(lat, dtype=np.float64))
+        lon = np.radians(np.asarray(lon, dtype=np.float64))
+        return np.stack([radius * np.cos(self._lat0) * lon, radius * lat], axis=-1)
+
+    def within(self, target, radius):
+        """
+        Find the candidate points within a radius
+
+        :param target: The given point coordinate (lat, long)
+        :type target: tuple-like
+
+        :param radius: The radius (mile)
+        :type radius: float
+
+        :returns: The positions of the candidate points, in ascending order
+        :rtype: array of int
+        """
+        idx = self._tree.query_ball_point(self._project(target[0], target[1]),
+                                          radius * (1 + self.MARGIN))
+        return np.sort(np.asarray(idx, dtype=np.int64))
+
+    def nearest(self, target, k):
+        """
+        Find the candidate points among which are the k nearest points
+
+        :param target: The given point coordinate (lat, long)
+        :type target: tuple-like
+
+        :param k: The number of nearest points
+        :type k: int
+
+        :returns: The positions of the candidate points, in ascending order
+        :rtype: array of int
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        dist, _ = self._tree.query(self._project(target[0], target[1]), k=k)
+        # Any point truly nearer than the k-th one is projected within the
+        # margin of the k-th projected distance
+        return self.within(target, np.max(dist) * (1 + self.MARGIN))
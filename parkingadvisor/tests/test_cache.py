@@ -0,0 +1,48 @@
+"""
+Testing the layer result cache
+"""
+
+from parkingadvisor.cache import LayerCache
+
+
+def test_hit_and_miss():
+    """
+    Testing results are computed once and counted
+    """
+    cache = LayerCache(maxsize=4)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get('a', compute) == 1
+    assert cache.get('a', compute) == 1
+    assert cache.get('b', compute) == 2
+    assert cache.info() == {'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 4}
+
+    cache.clear()
+    assert cache.info()['size'] == 0 and cache.hits == 0
+
+
+def test_size_bound():
+    """
+    Testing the least recently used entry is dropped when full
+    """
+    cache = LayerCache(maxsize=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    cache.get('a', lambda: 0)
+    cache.get('c', lambda: 3)
+
+    assert cache.info()['size'] == 2
+    assert cache.get('a', lambda: 0) == 1
+    assert cache.get('b', lambda: 0) == 0
+
+
+def test_ttl():
+    """
+    Testing entries expire after the time-to-live
+    """
+    cache = LayerCache(ttl=0)
+    cache.get('a', lambda: 1)
+
+    assert cache.get('a', lambda: 2) == 2
+    assert cache.misses == 2
@@ -0,0 +1,187 @@
+"""
+Testing the dataset registry module
+"""
+
+import os
+import stat
+import threading
+
+import numpy as np
+import pandas as pd
+
+from parkingadvisor import dataset, filter
+
+
+def _counting_reader(calls):
+    """
+    Create a csv reader which records every time it is called
+    """
+    def reader(path):
+        calls.append(path)
+        return pd.read_csv(path)
+    return reader
+
+
+def test_load_once(tmp_path):
+    """
+    Testing a dataset is read once and then served from memory
+    """
+    path = str(tmp_path / 'data.csv')
+    pd.DataFrame({'UNITDESC': ['A', 'B'], 'RATE': [1.0, 2.0]}).to_csv(path, index=False)
+
+    calls = []
+    reader = _counting_reader(calls)
+    first = dataset.load(path, reader)
+    second = dataset.load(path, reader)
+
+    assert len(calls) == 1
+    assert first.equals(second)
+
+    # Adding a column to a handed-out frame does not leak into the registry
+    first['DISTANCE'] = 0
+    assert 'DISTANCE' not in dataset.load(path, reader).columns
+
+
+def test_load_slow_read(tmp_path):
+    """
+    Testing a slow read only blocks the callers of the same dataset, which
+    is then read once
+    """
+    slow, fast = str(tmp_path / 'slow.csv'), str(tmp_path / 'fast.csv')
+    for path in (slow, fast):
+        pd.DataFrame({'UNITDESC': ['A'], 'RATE': [1.0]}).to_csv(path, index=False)
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_reader(path):
+        calls.append(path)
+        started.set()
+        release.wait(5)
+        return pd.read_csv(path)
+
+    threads = [threading.Thread(target=dataset.load, args=(slow, slow_reader))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+
+    # Another dataset is read while the slow one is being parsed
+    assert dataset.load(fast, pd.read_csv).shape == (1, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [slow]
+
+
+def test_load_reloads_on_change(tmp_path):
+    """
+    Testing a dataset is read again once the file changes on disk
+    """
+    path = str(tmp_path / 'data.csv')
+    pd.DataFrame({'RATE': [1.0]}).to_csv(path, index=False)
+
+    calls = []
+    reader = _counting_reader(calls)
+    assert dataset.load(path, reader).RATE.values[0] == 1
+
+    pd.DataFrame({'RATE': [2.0]}).to_csv(path, index=False)
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+    assert dataset.load(path, reader).RATE.values[0] == 2
+    assert len(calls) == 2
+
+
+def test_layers_share_datasets():
+    """
+    Testing the layer functions read each dataset file only once
+    """
+    dataset.clear()
+    filter.rate_layer(pd.Timestamp(2018, 12, 10, 8, 32))
+    filter.ev_layer()
+    filter.EStation('Array Apartments')
+    n_entries = len(dataset._REGISTRY)
+
+    filter.rate_layer(pd.Timestamp(2018, 12, 11, 10, 5))
+    filter.ev_layer()
+    filter.EStation('Array Apartments')
+    assert len(dataset._REGISTRY) == n_entries
+
+
+def test_artifact(tmp_path):
+    """
+    Testing an artifact is built once, memory-mapped and rebuilt once its
+    source changes
+    """
+    source = str(tmp_path / 'data.csv')
+    pd.DataFrame({'RATE': [1.0, 2.0]}).to_csv(source, index=False)
+    path = dataset.artifact_file(source, 'rate')
+    assert path == str(tmp_path / 'build' / 'data.v{}.rate.npy'.format(dataset.ARTIFACT_VERSION))
+
+    calls = []
+    def builder():
+        calls.append(source)
+        return pd.read_csv(source).RATE.values
+    array = dataset.artifact(path, [source], builder)
+
+    assert os.path.exists(path)
+    assert isinstance(array, np.memmap)
+    assert np.array_equal(dataset.artifact(path, [source], builder), [1, 2])
+    assert len(calls) == 1
+
+    pd.DataFrame({'RATE': [3.0]}).to_csv(source, index=False)
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(source, (mtime, mtime))
+    assert np.array_equal(dataset.artifact(path, [source], builder), [3])
+    assert len(calls) == 2
+
+    # A new builder version is built again and replaces the old file
+    new_path = dataset.artifact_file(source, 'rate', version=dataset.ARTIFACT_VERSION + 1)
+    assert np.array_equal(dataset.artifact(new_path, [source], builder), [3])
+    assert len(calls) == 3
+    assert os.path.exists(new_path) and not os.path.exists(path)
+
+
+def test_string_artifact(tmp_path):
+    """
+    Testing strings are saved and memory-mapped as one UTF-8 buffer
+    """
+    source = str(tmp_path / 'data.csv')
+    pd.DataFrame({'UNITDESC': ['PIKE ST', '', 'CAFÉ WAY']}).to_csv(source, index=False)
+    path = dataset.artifact_file(source, 'names')
+
+    calls = []
+    def builder():
+        calls.append(source)
+        return pd.read_csv(source, keep_default_na=False).UNITDESC.tolist()
+    table = dataset.string_artifact(path, [source], builder)
+
+    assert len(table) == 3
+    assert table[2] == 'CAFÉ WAY'
+    assert list(table) == ['PIKE ST', '', 'CAFÉ WAY']
+    assert os.path.exists(path[:-len('.npy')] + '_offsets.npy')
+
+    dataset.clear()
+    assert dataset.string_artifact(path, [source], builder).tolist() == table.tolist()
+    assert len(calls) == 1
+
+
+def test_save_file(tmp_path):
+    """
+    Testing threads saving the same file never leave a partial file
+    """
+    path = str(tmp_path / 'build' / 'plot.svg')
+    payloads = [bytes([i]) * 200000 for i in range(8)]
+
+    threads = [threading.Thread(target=dataset.save_file, args=(path, data))
+               for data in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, 'rb') as file:
+        assert file.read() in payloads
+    assert os.listdir(str(tmp_path / 'build')) == ['plot.svg']
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~dataset._UMASK
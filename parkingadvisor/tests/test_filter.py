@@ -3,59 +3,79 @@ Testing the filtering data module
 """
 
 from datetime import datetime
+import json
+import os
+import shutil
 import numpy as np
 import pandas as pd
 import geopandas as gpd
+import pytest
+import shapely
 
-from parkingadvisor import filter
+from parkingadvisor import filter, flows, rates, wire
 
 
 TEST_STREET_NAME = '10TH AVE BETWEEN E MADISON ST AND E SENECA ST'
 
-def test_model_flow():
-    """
-    Testing the interpolation of parking occupancy data to generate
-    a smoothed dataframe over 12 am-12 pm
-    """
-    # Use the first 20 rows to create a small dataframe
-    # including street name '10TH AVE BETWEEN E MADISON ST AND E SENECA ST'
-    df_test = pd.read_csv(filter._FLOW_RAW)
-    street = df_test.loc[df_test['UNITDESC'] == TEST_STREET_NAME]
-    df_result = filter._model_flow(street)
-
-    assert np.array_equal(df_result.columns.values, ['TIME', 'OCCUPANCY'])
-    assert df_result['TIME'].min() == 0 and df_result['TIME'].max() == 24
-    assert df_result['OCCUPANCY'].any() >= 0
-
-
-def test_loc_period():
-    """
-    Testing the fuction which create the rate of all streets at specific time
-    """
-    # Check the results in 5 different time
-    test_data = pd.DataFrame(data={'UNITDESC': TEST_STREET_NAME,
-                                   'WKD_START1': 8,
-                                   'WKD_START2': 11,
-                                   'WKD_START3':17,
-                                   'WKD_END': 22,
-                                   'WKD_RATE1': 2,
-                                   'WKD_RATE2': 3,
-                                   'WKD_RATE3': 2}, index=[0])
-    # Before morning - free
-    bf_morn = filter._loc_period(test_data, 5)
-    assert bf_morn.RATE.values[0] == 0
-    # Morning
-    morn = filter._loc_period(test_data, 10)
-    assert morn.RATE.values[0] == 2
-    # Afternoon
-    aftn = filter._loc_period(test_data, 16)
-    assert aftn.RATE.values[0] == 3
-    # Evening
-    even = filter._loc_period(test_data, 20)
-    assert even.RATE.values[0] == 2
-    # After Evening
-    even = filter._loc_period(test_data, 23)
-    assert even.RATE.values[0] == 0
+def test_distance_df():
+    """
+    Testing the distance from a destination to all streets
+    """
+    df = filter.distance_df((47.6062, -122.3321))
+    assert np.array_equal(df.columns.values, ['UNITDESC', 'DISTANCE'])
+    assert df.shape[0] == 1232
+    assert df.DISTANCE.min() > 0
+
+    df_fast = filter.distance_df((47.6062, -122.3321), method='haversine')
+    assert np.allclose(df_fast.DISTANCE, df.DISTANCE, rtol=0.003)
+
+
+def test_street_points():
+    """
+    Testing the reference points of all streets
+    """
+    points = filter.street_points()
+    assert points.shape == (1232,)
+    assert np.all(points['MIN_LAT'] <= points['MID_LAT'])
+    assert np.all(points['MID_LAT'] <= points['MAX_LAT'])
+    assert np.all(points['MIN_LON'] <= points['CEN_LON'])
+    assert np.all(points['CEN_LON'] <= points['MAX_LON'])
+
+
+def test_streets_within():
+    """
+    Testing finding streets around a destination by the spatial index
+    """
+    dest = (47.6062, -122.3321)
+    df_all = filter.distance_df(dest)
+    df = filter.streets_within(dest, 0.5)
+
+    assert set(df.UNITDESC) == set(df_all.loc[df_all.DISTANCE <= 0.5, 'UNITDESC'])
+    assert df.DISTANCE.is_monotonic_increasing
+    assert df.shape[0] == filter.distance_df(dest, radius=0.5).shape[0]
+
+
+def test_nearest_streets():
+    """
+    Testing finding the nearest streets of a destination
+    """
+    dest = (47.6062, -122.3321)
+    df_all = filter.distance_df(dest).sort_values('DISTANCE')
+    df = filter.nearest_streets(dest, 20)
+
+    assert np.array_equal(df.UNITDESC.values, df_all.UNITDESC.values[:20])
+    assert filter.nearest_streets(dest, 5000).shape[0] == 1232
+
+
+def test_streets_in_bounds():
+    """
+    Testing finding the street lines crossing a bounding box
+    """
+    df = filter.streets_in_bounds((-122.335, 47.605, -122.33, 47.61))
+
+    assert isinstance(df, gpd.GeoDataFrame)
+    assert 0 < df.shape[0] < 1232
+    assert filter.streets_in_bounds((0, 0, 1, 1)).empty
 
 
 def test_select_street():
@@ -69,6 +89,23 @@ def test_select_street():
     assert info.PARKING_TIME_LIMIT.values[0] == 120
     assert info.UNITDESC.values[0] == TEST_STREET_NAME
 
+    index = filter.name_index(filter.RATE_FILE, rates.read_rate, 'UNITDESC')
+    df = filter.dataset.load(filter.RATE_FILE, rates.read_rate)
+    info = filter.select_street(TEST_STREET_NAME.lower(), df, index)
+    assert info.UNITDESC.values[0] == TEST_STREET_NAME
+
+
+def test_search_streets():
+    """
+    Testing the prefix search of street and station names
+    """
+    found = filter.search_streets('10th ave between', limit=3)
+
+    assert len(found) == 3
+    assert found == sorted(found)
+    assert all(name.startswith('10TH AVE BETWEEN') for name in found)
+    assert 'Array Apartments' in filter.search_stations('array')
+
 
 def	test_Street():
     """
@@ -76,12 +113,42 @@ def	test_Street():
     """
     test = filter.Street(TEST_STREET_NAME)
     assert test.name == TEST_STREET_NAME
+    assert filter.Street(' ' + TEST_STREET_NAME.lower()).name == TEST_STREET_NAME
 
     test.get_limit()
     test.get_rate()
     assert np.array_equal(test.rate.shape, [3, 4])
     assert test.limit == 2
     assert test.get_flow_plot
+    assert list(test.rate.iloc[1]) == ['WKD', 2.0, 3.0, 3.0]
+
+    # Fields are computed once and no per-instance dict is allocated
+    assert test.get_rate() is test.rate
+    assert test.get_flow_plot() is test.plot
+    assert not hasattr(test, '__dict__')
+
+    assert test.get_flow_plot('svg').startswith('<svg')
+    with pytest.raises(ValueError):
+        test.get_flow_plot('html')
+
+
+def test_Street_fresh_data(tmp_path, monkeypatch):
+    """
+    Testing a street can be the first request on fresh data, before the
+    smoothed flow file or any artifact exists
+    """
+    for module, name in ((filter, 'RATE_FILE'), (flows, 'FLOW_RAW')):
+        path = str(tmp_path / os.path.basename(getattr(module, name)))
+        shutil.copy(getattr(module, name), path)
+        monkeypatch.setattr(module, name, path)
+    for module in (filter, flows):
+        monkeypatch.setattr(module, 'FLOW_FILE', str(tmp_path / 'flow_all_streets.csv'))
+    monkeypatch.setattr(flows, '_FLOW_BUILDS', (str(tmp_path / 'build' / 'flow_all_streets.csv'),))
+
+    street = filter.Street(TEST_STREET_NAME)
+    assert street.name == TEST_STREET_NAME
+    assert street.limit == 2
+    assert street.get_flow_plot('svg').startswith('<svg')
 
 
 def test_flow_layer():
@@ -95,6 +162,21 @@ def test_flow_layer():
     assert df.shape[0] == 1234
 
 
+def test_flow_matrix():
+    """
+    Testing the dense occupancy matrix of all streets
+    """
+    names, matrix = filter.flow_matrix()
+    assert matrix.shape == (1234, 241)
+    assert matrix.dtype == np.float32
+    assert np.all(names[:-1] < names[1:])
+
+    # Each column is the flow layer of one time slot
+    df = filter.flow_layer(datetime(2018, 12, 10, 8, 32))
+    assert np.allclose(df.OCCUPANCY.values, matrix[:, 85])
+    assert np.allclose(df.TIME, 8.5)
+
+
 def test_rate_layer():
     """
     Testing creating rate layer
@@ -106,6 +188,36 @@ def test_rate_layer():
     assert df.shape[0] == 1234
 
 
+def test_rate_cube():
+    """
+    Testing the precomputed rate cube of all streets
+    """
+    names, cube = filter.rate_cube()
+    assert cube.shape == (3, 24, 1234)
+    assert cube.dtype == np.float32
+    assert np.all(cube[2] == 0)
+
+    # Each slice is the rate layer of one day type and hour
+    df = filter.rate_layer(datetime(2018, 12, 15, 12, 3))
+    assert np.array_equal(df.UNITDESC.values, names)
+    assert np.array_equal(df.RATE.values, cube[1, 12])
+
+
+def test_rate_layer_minutes(tmp_path):
+    """
+    Testing the rate of a section which does not start on the hour
+    """
+    raw = pd.read_csv(filter.RATE_FILE, index_col=0)
+    raw = raw.loc[raw['UNITDESC'] == TEST_STREET_NAME]
+    raw[['WKD_END1', 'WKD_START2']] = 11.5
+    file_rate = str(tmp_path / 'rate.csv')
+    raw.to_csv(file_rate)
+
+    rates = [filter.rate_layer(datetime(2018, 12, 10, 11, minute), file_rate).RATE.values[0]
+             for minute in (0, 29, 30, 59)]
+    assert rates == [2, 2, 3, 3]
+
+
 def test_recomm_layer():
     """
     Testing recommand layer
@@ -117,6 +229,155 @@ def test_recomm_layer():
         assert df[col].max() == 1
         assert df[col].dtype == 'float'
 
+    # Only score the streets around the destination
+    df_near = filter.recomm_layer((47.6062, -122.3321), datetime(2018, 12, 10, 8, 32),
+                                  radius=0.5)
+    assert 0 < df_near.shape[0] < df.shape[0]
+    assert df_near.RECOMM.min() == 0 and df_near.RECOMM.max() == 1
+
+
+def test_street_rows():
+    """
+    Testing the alignment of the rate, flow and GIS streets
+    """
+    rate_rows, flow_rows, gis_rows = filter.street_rows()
+    rate_names = filter.rate_cube()[0][rate_rows]
+
+    assert np.array_equal(rate_names, filter.flow_matrix()[0][flow_rows])
+    assert np.array_equal(rate_names, filter.street_points()['UNITDESC'][gis_rows])
+    assert len(set(rate_names)) == len(rate_names)
+
+
+def test_street_dictionary():
+    """
+    Testing the street ids shared by the rate, flow and GIS files
+    """
+    names = filter.street_dictionary().tolist()
+    assert names == sorted(set(names))
+
+    for path, file_reader in ((filter.RATE_FILE, filter.rate_streets),
+                              (filter.FLOW_FILE, filter.flow_streets),
+                              (filter.GIS_FILE, filter._gis_streets)):
+        ids = filter.street_ids(path, file_reader)
+        assert ids.dtype == np.int32
+        assert np.array_equal(np.array(names)[ids], file_reader(path)['UNITDESC'])
+
+    # The layers only hold the ids
+    df = filter.rate_layer(datetime(2018, 12, 10, 8, 32))
+    assert df.UNITDESC.dtype == filter.street_dtype()
+    assert np.array_equal(df.UNITDESC.cat.codes, filter.street_ids(filter.RATE_FILE,
+                                                                    filter.rate_streets))
+
+
+def test_slot_layers():
+    """
+    Testing the layers precomputed at every time slot
+    """
+    table = filter.slot_layers()
+    rate_rows, flow_rows, _ = filter.street_rows()
+    assert table.shape == (4, 241, len(rate_rows))
+
+    for date_time in (datetime(2018, 12, 10, 8, 32), datetime(2018, 12, 15, 17, 0),
+                      datetime(2018, 12, 16, 23, 59)):
+        assert np.array_equal(filter.slot_values(date_time, 'RATE'),
+                              filter.rate_layer(date_time).RATE.values[rate_rows])
+        assert np.array_equal(filter.slot_values(date_time, 'OCCUPANCY'),
+                              filter.flow_layer(date_time).OCCUPANCY.values[flow_rows])
+
+        # The map layers are drawn without dataframes
+        assert (filter.slot_geojson(date_time, 'RATE', zoom=12)
+                == filter.to_geojson(filter.rate_layer(date_time), zoom=12))
+        assert (filter.slot_geojson(date_time, 'OCCUPANCY')
+                == filter.to_geojson(filter.flow_layer(date_time)))
+
+    with pytest.raises(ValueError):
+        filter.slot_values(datetime(2018, 12, 10, 8, 32), 'RECOMM')
+
+
+def test_recomm_scores():
+    """
+    Testing the recommand score of aligned arrays
+    """
+    values, score = filter.recomm_scores(np.array([0., 1., 2.]), np.array([.5, .5, .5]),
+                                         np.array([.1, 1., 10.]), (0.5, 0, 0.5))
+
+    # A constant column is normalized to 1
+    assert np.allclose(values, [[0, 1, 0], [0.5, 1, 0.5], [1, 1, 1]])
+    assert np.allclose(score, [1, 0.5, 0])
+
+    values, score = filter.recomm_scores(np.zeros(0), np.zeros(0), np.zeros(0))
+    assert values.shape == (0, 3) and score.shape == (0,)
+
+
+def test_recomm_layer_batch():
+    """
+    Testing recommand scores of many destinations and times at once
+    """
+    dests = [(47.6062, -122.3321), (47.62, -122.35), (47.6062, -122.3321)]
+    times = [datetime(2018, 12, 10, 8, 32), datetime(2018, 12, 15, 12, 3),
+             datetime(2018, 12, 16, 14, 0)]
+    names, scores = filter.recomm_layer_batch(dests, times)
+    assert scores.shape == (3, len(names))
+
+    # Each query has the same scores as the single query
+    for i, (dest, date_time) in enumerate(zip(dests, times)):
+        df = filter.recomm_layer(dest, date_time)
+        assert np.array_equal(df.UNITDESC.values, names)
+        assert np.allclose(scores[i], df.RECOMM.values, atol=1e-6)
+
+    df_batch = filter.recomm_layer_batch(dests, times, long_format=True)
+    assert np.array_equal(df_batch.columns.values, ['QUERY', 'UNITDESC', 'RECOMM'])
+    assert df_batch.shape[0] == scores.size
+
+    with pytest.raises(ValueError):
+        filter.recomm_layer_batch(dests, times[:2])
+
+
+def test_top_k_streets():
+    """
+    Testing the k streets with the best recommand scores
+    """
+    dest = (47.6062, -122.3321)
+    df_top = filter.top_k_streets(dest, datetime(2018, 12, 10, 8, 32), k=5)
+    df = filter.recomm_layer(dest, datetime(2018, 12, 10, 8, 32))
+    df = df.sort_values('RECOMM', ascending=False, kind='mergesort').head(5)
+
+    assert isinstance(df_top, gpd.GeoDataFrame)
+    assert np.array_equal(df_top.UNITDESC.values, df.UNITDESC.values)
+    assert np.allclose(df_top.RECOMM.values, df.RECOMM.values)
+    assert df_top.geometry.notnull().all()
+
+    # Constrained by radius
+    df_near = filter.top_k_streets(dest, datetime(2018, 12, 10, 8, 32), k=5, radius=0.3,
+                                   geometry=False)
+    assert df_near.shape[0] <= 5 and 'geometry' not in df_near.columns
+    assert filter.top_k_streets(dest, datetime(2018, 12, 10, 8, 32), radius=0.01).empty
+
+
+def test_cached_recomm_layer():
+    """
+    Testing recommand layer served from the cache
+    """
+    cache = filter.LayerCache()
+    dest = (47.6062, -122.3321)
+    df = filter.cached_recomm_layer(dest, datetime(2018, 12, 10, 8, 32), cache=cache)
+    assert cache.info()['misses'] == 1
+
+    # Same grid cell and flow slot
+    df_near = filter.cached_recomm_layer((47.60622, -122.33208), datetime(2018, 12, 10, 8, 30),
+                                         cache=cache)
+    assert cache.info()['hits'] == 1
+    assert df_near.equals(df)
+
+    # Another time slot or factor is computed again
+    filter.cached_recomm_layer(dest, datetime(2018, 12, 10, 9, 32), cache=cache)
+    filter.cached_recomm_layer(dest, datetime(2018, 12, 10, 8, 32), (0.5, 0.5, 0), cache=cache)
+    assert cache.info()['misses'] == 3
+
+    # The snapped result is close to the exact one
+    df_exact = filter.recomm_layer(dest, datetime(2018, 12, 10, 8, 32))
+    assert np.allclose(df.RECOMM, df_exact.RECOMM, atol=0.05)
+
 
 def test_link_to_gis():
     """
@@ -128,26 +389,137 @@ def test_link_to_gis():
     assert 'geometry' in df_gis.columns.values
     assert isinstance(df_gis, gpd.GeoDataFrame)
 
+    # The simplified streets of a low zoom keep every street
+    df_low = filter.link_to_gis(df_property, zoom=12)
+    assert len(df_low) == len(df_gis)
+    assert (shapely.get_num_coordinates(df_low.geometry.values.data).sum()
+            < shapely.get_num_coordinates(df_gis.geometry.values.data).sum())
+
+
+def test_street_level():
+    """
+    Testing the simplified street levels of the map zooms
+    """
+    assert filter.street_level(filter.FULL_ZOOM) is None
+    assert filter.street_level(None) is None
+
+    coords, part_offsets, offsets, multi = filter.street_level(11)
+    assert np.array_equal(coords, filter.street_level(10)[0])
+    assert len(offsets) == len(filter.street_lines()) + 1
+    assert np.all(np.diff(part_offsets) >= 2)
+
+    counts = filter.build_pyramid()
+    assert counts[10] <= counts[12] <= counts[14]
+
 
-def test_ev_layer():
+def test_street_level_multi(tmp_path):
     """
-    Testing the EV layer dataframe
+    Testing the simplified levels and the rounded payload keep the parts of
+    multi-lines
     """
-    assert filter.ev_layer
+    path = str(tmp_path / 'streets.json')
+    features = [
+        {'type': 'Feature', 'properties': {'UNITDESC': 'STRAIGHT ST'},
+         'geometry': {'type': 'LineString',
+                      'coordinates': [[-122.34, 47.60], [-122.32, 47.62]]}},
+        {'type': 'Feature', 'properties': {'UNITDESC': 'SPLIT AVE'},
+         'geometry': {'type': 'MultiLineString',
+                      'coordinates': [[[-122.30, 47.60], [-122.30, 47.61]],
+                                      [[-122.30, 47.63], [-122.29, 47.63]]]}}]
+    with open(path, 'w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
 
+    lines = filter.street_lines(path, zoom=12)
+    assert [line.geom_type for line in lines] == ['LineString', 'MultiLineString']
+    assert len(lines[1].geoms) == 2
 
-def test_EStation():
+    geometries = [json.loads(fragment)
+                  for fragment in filter.dataset.load(path, filter._level_fragments, level=12)]
+    assert geometries[1]['type'] == 'MultiLineString'
+
+    features = json.loads(filter.geometry_payload(path, precision=3))['features']
+    assert features[1]['geometry'] == {
+        'type': 'MultiLineString',
+        'coordinates': [[[-122.3, 47.6], [-122.3, 47.61]], [[-122.3, 47.63], [-122.29, 47.63]]]}
+
+
+def test_open_shared():
     """
-    Testing the class EStation
+    Testing the shared arrays are memory-mapped and give the same streets
+    as the GeoJSON file
     """
-    test = filter.EStation('Array Apartments')
-    assert test.address == "14027 Lake City Way NE"
-    assert test.phone == "800-663-5633"
-    assert test.code == 98125
-    assert test.NEMA520 == False
-    assert test.J1772 == True
-    assert test.CHADEMO == False
-    assert test.TESLA == False
-    assert test.level1 == False
-    assert test.level2 == True
-    assert test.dc == False
+    assert filter.open_shared() > 0
+
+    coords, part_offsets, offsets, multi = filter.street_geometry()
+    gdf = filter.store.read_geo(filter.GIS_FILE)
+    assert len(offsets) == len(gdf) + 1
+    assert filter.street_lines().geom_equals(gdf.geometry.values).all()
+
+
+def test_to_geojson():
+    """
+    Testing the GeoJSON spliced from pre-serialized geometries
+    """
+    df_rate = filter.rate_layer(datetime(2018, 12, 10, 8, 32))
+    df_rate.loc[0, 'RATE'] = np.nan
+    df_rate.loc[1, 'UNITDESC'] = np.nan
+
+    assert filter.to_geojson(df_rate) == filter.link_to_gis(df_rate).to_json()
+    assert (filter.to_geojson(df_rate, zoom=12)
+            == filter.link_to_gis(df_rate, zoom=12).to_json())
+
+    # Street names as strings are looked up by name
+    df_names = df_rate.astype({'UNITDESC': object})
+    df_names.loc[1, 'UNITDESC'] = 'NOT A STREET'
+    assert filter.to_geojson(df_names) == filter.to_geojson(df_rate)
+    assert filter.link_to_gis(df_names).to_json() == filter.link_to_gis(df_rate).to_json()
+
+
+def test_recomm_geojson():
+    """
+    Testing the cached GeoJSON of recommand scores
+    """
+    cache, geojson_cache = filter.LayerCache(), filter.LayerCache()
+    dest = (47.6062, -122.3321)
+    text = filter.recomm_geojson(dest, datetime(2018, 12, 10, 8, 32), cache=cache,
+                                 geojson_cache=geojson_cache)
+    assert filter.recomm_geojson(dest, datetime(2018, 12, 10, 8, 32, 30), cache=cache,
+                                 geojson_cache=geojson_cache) is text
+
+    # The texts do not take the slots of the dataframes
+    assert cache.info()['size'] == 1 and geojson_cache.info()['size'] == 1
+
+    features = json.loads(text)['features']
+    assert len(features) == filter.cached_recomm_layer(dest, datetime(2018, 12, 10, 8, 32),
+                                                       cache=cache).shape[0]
+    assert 'RECOMM' in features[0]['properties']
+
+
+def test_layer_payload():
+    """
+    Testing the layer properties sent without geometry
+    """
+    df = filter.recomm_layer((47.6062, -122.3321), datetime(2018, 12, 10, 8, 32))
+    features = json.loads(filter.geometry_payload())['features']
+
+    # Values are in the order of the geometry features
+    values = filter.street_values(df, 'RECOMM')
+    names = [feature['properties']['UNITDESC'] for feature in features]
+    assert np.allclose(values, df.set_index('UNITDESC').RECOMM[names].values)
+
+    payload = filter.layer_payload(df, ['RECOMM'])
+    assert np.allclose(wire.decode_values(payload['RECOMM']), values, atol=1 / 254)
+
+    payload = filter.layer_payload(df, ['RECOMM'], 'json')
+    assert payload[str(features[3]['id'])]['RECOMM'] == values[3]
+
+    for fmt in (True, 'float64'):
+        with pytest.raises(ValueError):
+            filter.layer_payload(df, ['RECOMM'], fmt)
+
+    # The coordinates are rounded
+    features = json.loads(filter.geometry_payload(precision=3))['features']
+    assert features[0]['geometry']['coordinates'][0][0] == round(
+        features[0]['geometry']['coordinates'][0][0], 3)
+
+
@@ -0,0 +1,66 @@
+"""
+Testing the occupancy data module
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+from parkingadvisor import flows
+
+
+TEST_STREET_NAME = '10TH AVE BETWEEN E MADISON ST AND E SENECA ST'
+
+
+def _model_flow(d_flow_hour):
+    """
+    Smooth the occupancy profile of one street by interpolation ('cubic'),
+    the per-street reference of the batched smoothing
+    """
+    from scipy.interpolate import interp1d
+
+    f_flow = interp1d(d_flow_hour['HOUR'], d_flow_hour['OCCUPANCY'], kind='cubic',
+                      fill_value='extrapolate')
+    flow = np.maximum(f_flow(flows.TIME_SLOTS), 0)
+
+    return pd.DataFrame({'TIME': flows.TIME_SLOTS, 'OCCUPANCY': flow})
+
+
+def test_create_smooth_flow_file(tmp_path):
+    """
+    Testing the batched smoothing of all streets agrees with smoothing
+    each street alone
+    """
+    file_out = str(tmp_path / 'flow.csv')
+    df_result = flows._create_smooth_flow_file(file_out=file_out)
+
+    assert np.array_equal(df_result.columns.values, ['TIME', 'OCCUPANCY', 'UNITDESC'])
+    assert df_result.shape[0] == 1234 * 241
+    assert df_result['OCCUPANCY'].min() >= 0
+
+    df_test = pd.read_csv(flows.FLOW_RAW)
+    street = df_test.loc[df_test['UNITDESC'] == TEST_STREET_NAME]
+    df_expect = _model_flow(street)
+    df_saved = pd.read_csv(file_out, index_col=0)
+    df_street = df_saved.loc[df_saved['UNITDESC'] == TEST_STREET_NAME]
+    assert np.allclose(df_street['TIME'], df_expect['TIME'])
+    assert np.allclose(df_street['OCCUPANCY'], df_expect['OCCUPANCY'])
+
+
+def test_flow_file(tmp_path, monkeypatch):
+    """
+    Testing the smoothed flow file is generated into the first writable
+    build folder
+    """
+    (tmp_path / 'data').mkdir()
+    # A folder which can not be created, as in a read-only package
+    (tmp_path / 'readonly').write_text('')
+    builds = (str(tmp_path / 'readonly' / 'build' / 'flow.csv'), str(tmp_path / 'cache' / 'flow.csv'))
+    monkeypatch.setattr(flows, 'FLOW_FILE', str(tmp_path / 'data' / 'flow.csv'))
+    monkeypatch.setattr(flows, '_FLOW_BUILDS', builds)
+
+    assert flows.flow_file(flows.FLOW_FILE) == builds[1]
+    assert os.path.exists(builds[1])
+    assert not os.path.exists(flows.FLOW_FILE)
+    assert flows.flow_file(flows.FLOW_FILE) == builds[1]
+    assert os.listdir(str(tmp_path / 'cache')) == ['flow.csv']
@@ -0,0 +1,64 @@
+"""
+Testing the vectorized distance calculations
+"""
+
+import numpy as np
+import pytest
+from geopy.distance import geodesic, great_circle
+
+from parkingadvisor import geodesy
+
+
+DEST = (47.6062, -122.3321)
+
+
+def _random_points(num, seed=0):
+    """
+    Create random points around Seattle
+    """
+    rng = np.random.RandomState(seed)
+    lat = rng.uniform(47.49, 47.74, num)
+    lon = rng.uniform(-122.44, -122.23, num)
+    return lat, lon
+
+
+def test_vincenty():
+    """
+    Testing the ellipsoidal distance against geopy
+    """
+    lat, lon = _random_points(200)
+    result = geodesy.vincenty(DEST[0], DEST[1], lat, lon)
+    expect = [geodesic(DEST, p).miles for p in zip(lat, lon)]
+
+    assert result.shape == (200,)
+    assert np.allclose(result, expect, rtol=0, atol=1e-9)
+    # Coincident and long-range points
+    assert geodesy.vincenty(DEST[0], DEST[1], DEST[0], DEST[1]) == 0
+    assert geodesy.vincenty(47.6, -122.3, -33.9, 151.2) == \
+        pytest.approx(geodesic((47.6, -122.3), (-33.9, 151.2)).miles, abs=1e-6)
+
+
+def test_haversine():
+    """
+    Testing the spherical distance against geopy and its error bound
+    """
+    lat, lon = _random_points(200)
+    result = geodesy.haversine(DEST[0], DEST[1], lat, lon)
+    expect = np.array([great_circle(DEST, p).miles for p in zip(lat, lon)])
+    exact = geodesy.vincenty(DEST[0], DEST[1], lat, lon)
+
+    assert np.allclose(result, expect)
+    assert np.all(np.abs(result - exact) <= 0.003 * exact)
+
+
+def test_distance():
+    """
+    Testing choosing the accuracy mode
+    """
+    lat, lon = _random_points(10)
+    assert np.array_equal(geodesy.distance(DEST, lat, lon),
+                          geodesy.vincenty(DEST[0], DEST[1], lat, lon))
+    assert np.array_equal(geodesy.distance(DEST, lat, lon, 'haversine'),
+                          geodesy.haversine(DEST[0], DEST[1], lat, lon))
+    with pytest.raises(ValueError):
+        geodesy.distance(DEST, lat, lon, 'euclidean')
@@ -0,0 +1,79 @@
+"""
+Testing importing the package loads no heavy dependency, whose import
+time would be paid by every worker and CLI job at startup
+"""
+
+import json
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ('geopandas', 'shapely', 'matplotlib', 'scipy.interpolate',
+                 'folium', 'branca', 'pkg_resources')
+
+_LOADED = '''
+import json, sys
+import parkingadvisor.filter
+loaded = [name for name in {heavy!r}
+          if type(sys.modules.get(name)).__name__ == 'module']
+print(json.dumps(loaded))
+'''
+
+
+def test_import_loads_no_heavy_module():
+    """
+    Testing importing the layer functions loads no heavy dependency
+    """
+    code = _LOADED.format(heavy=HEAVY_MODULES)
+    loaded = json.loads(subprocess.check_output([sys.executable, '-c', code]))
+
+    # Lazily imported modules exist but are not loaded until first use
+    assert loaded == []
+
+
+def test_exports():
+    """
+    Testing every name of the package is served from its module, without
+    importing the other modules
+    """
+    import parkingadvisor
+    from parkingadvisor import filter
+
+    assert parkingadvisor.__all__ == sorted(set(parkingadvisor.__all__))
+    assert parkingadvisor.flow_layer is filter.flow_layer
+    assert set(parkingadvisor.__all__) <= set(dir(parkingadvisor))
+
+    code = 'import sys, parkingadvisor; parkingadvisor.Street; print("folium" in sys.modules)'
+    assert subprocess.check_output([sys.executable, '-c', code]).strip() == b'False'
+
+
+def test_lazy_import_threads(tmp_path, monkeypatch):
+    """
+    Testing a lazily imported module runs once when threads read it at the
+    same time
+    """
+    import threading
+    from parkingadvisor.lazy import lazy_import
+
+    log = tmp_path / 'runs.txt'
+    (tmp_path / 'slow_module.py').write_text(
+        'import time\n'
+        'with open({!r}, "a") as file:\n'
+        '    file.write("run\\n")\n'
+        'time.sleep(0.2)\n'
+        'VALUE = 42\n'.format(str(log)))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'slow_module', raising=False)
+
+    module = lazy_import('slow_module')
+    assert not log.exists()
+
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(module.VALUE)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert values == [42] * 8
+    assert log.read_text() == 'run\n'
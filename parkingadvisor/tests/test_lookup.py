@@ -0,0 +1,35 @@
+"""
+Testing the name index
+"""
+
+import numpy as np
+
+from parkingadvisor import lookup
+
+
+def test_normalize_name():
+    """
+    Testing the lookup key of a name
+    """
+    assert lookup.normalize_name('  10th  Ave\tE ') == '10th ave e'
+    assert lookup.normalize_name('PIKE ST') == lookup.normalize_name('pike st')
+
+
+def test_NameIndex():
+    """
+    Testing the rows and prefix search of the name index
+    """
+    index = lookup.NameIndex(['PIKE ST', 'PINE ST', 'pike  st', 'UNION ST', None])
+
+    assert index.size == 3
+    assert np.array_equal(index.rows(' Pike St'), [0, 2])
+    assert np.array_equal(index.rows('UNION ST'), [3])
+    assert len(index.rows('MAIN ST')) == 0
+    assert index.name('pine st') == 'PINE ST'
+    assert index.name('MAIN ST') is None
+    assert 'union st' in index
+
+    assert index.prefix('pi') == ['PIKE ST', 'PINE ST']
+    assert index.prefix('PI', limit=1) == ['PIKE ST']
+    assert index.prefix('') == ['PIKE ST', 'PINE ST', 'UNION ST']
+    assert index.prefix('x') == []
@@ -0,0 +1,111 @@
+"""
+Testing the vector tile encoder
+"""
+
+import struct
+
+import numpy as np
+
+from parkingadvisor import mvt
+
+
+def _read_varint(data, pos):
+    """
+    Read a protobuf varint
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _read_message(data):
+    """
+    Read the fields of a protobuf message as {field: [values]}
+    """
+    fields = {}
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        else:
+            size, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + size], pos + size
+        fields.setdefault(field, []).append(value)
+    return fields
+
+
+def _read_packed(data):
+    """
+    Read a packed repeated varint field
+    """
+    values = []
+    pos = 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def test_tile_bounds():
+    """
+    Testing the bounding box of web mercator tiles
+    """
+    assert np.allclose(mvt.tile_bounds(0, 0, 0), (-180, -85.0511287798, 180, 85.0511287798))
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(1, 1, 0)
+    assert (min_lon, min_lat, max_lon) == (0, 0, 180)
+
+    # The corners of a tile are projected to the corners of its grid
+    z, x, y = 15, 5249, 11443
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(z, x, y)
+    grid = mvt.project([[min_lon, max_lat], [max_lon, min_lat]], z, x, y)
+    assert np.allclose(grid, [[0, 0], [mvt.EXTENT, mvt.EXTENT]])
+
+
+def test_line_geometry():
+    """
+    Testing the geometry commands of lines
+    """
+    # Repeated points are dropped, single-point lines are skipped
+    commands = mvt.line_geometry([[[2, 2], [2, 2], [5, 3]], [[9, 9]], [[5, 3], [1, 1]]])
+    assert list(commands) == [9, 4, 4, 10, 6, 2, 9, 0, 0, 10, 7, 3]
+    assert len(mvt.line_geometry([[[1, 1], [1, 1]]])) == 0
+
+
+def test_encode_layer():
+    """
+    Testing a tile can be decoded back to its features
+    """
+    features = [(7, {'UNITDESC': 'A ST', 'RATE': 1.5}, [[[0, 0], [300, 4096]]]),
+                (9, {'UNITDESC': 'B ST', 'RATE': float('nan')}, [[[10, 10], [10, 10]]]),
+                (12, {'UNITDESC': 'C ST', 'RATE': 1.5}, [[[5, 5], [200, 6]]])]
+    tile = _read_message(mvt.encode_tile([mvt.encode_layer('rate', features)]))
+    layer = _read_message(tile[3][0])
+
+    assert layer[15] == [2] and layer[1] == [b'rate'] and layer[5] == [mvt.EXTENT]
+    keys = [key.decode() for key in layer[3]]
+    values = [_read_message(value) for value in layer[4]]
+
+    decoded = {}
+    for message in layer[2]:
+        feature = _read_message(message)
+        tags = _read_packed(feature[2][0])
+        props = {}
+        for key, value in zip(tags[::2], tags[1::2]):
+            value = values[value]
+            props[keys[key]] = (value[1][0].decode() if 1 in value
+                                else struct.unpack('<d', value[3][0])[0])
+        decoded[feature[1][0]] = (props, _read_packed(feature[4][0]))
+
+    # The feature without any line left is skipped, equal values are shared
+    assert sorted(decoded) == [7, 12]
+    assert len(values) == 3
+    assert decoded[7] == ({'UNITDESC': 'A ST', 'RATE': 1.5}, [9, 0, 0, 10, 600, 8192])
@@ -0,0 +1,45 @@
+"""
+Testing the street plot rendering cache
+"""
+
+import os
+
+import pytest
+
+from parkingadvisor import filter, plots
+from parkingadvisor.tests.test_filter import TEST_STREET_NAME
+
+
+def test_flow_plot(tmp_path):
+    """
+    Testing rendering a street plot once and serving it from the caches
+    """
+    plots.PLOT_CACHE.clear()
+    # A plot of an older flow dataset version
+    (tmp_path / 'old').mkdir()
+    (tmp_path / 'old' / 'plot.svg').write_bytes(b'')
+    name, image = plots.flow_plot(TEST_STREET_NAME, cache_dir=str(tmp_path))
+
+    assert name.endswith('.svg')
+    assert b'<svg' in image
+    assert os.listdir(str(tmp_path)) == [os.path.dirname(name)]
+    assert (tmp_path / name).read_bytes() == image
+
+    # The same street in other spelling is served from memory
+    assert plots.flow_plot(TEST_STREET_NAME.lower(), cache_dir=str(tmp_path)) == (name, image)
+    assert plots.PLOT_CACHE.info()['hits'] == 1
+
+    # A new process reads the saved plot
+    plots.PLOT_CACHE.clear()
+    assert plots.flow_plot(TEST_STREET_NAME, cache_dir=str(tmp_path))[1] == image
+
+    # A street already looked up is not resolved again
+    street = filter.Street(TEST_STREET_NAME)
+    assert plots.flow_plot(street, cache_dir=str(tmp_path)) == (name, image)
+
+    png_name, png = plots.flow_plot(TEST_STREET_NAME, 'png', cache_dir=None)
+    assert png.startswith(b'\x89PNG')
+    assert png_name.endswith('.png')
+
+    with pytest.raises(ValueError):
+        plots.flow_plot(TEST_STREET_NAME, 'gif')
@@ -0,0 +1,66 @@
+"""
+Testing the parking rate data module
+"""
+
+import numpy as np
+import pandas as pd
+
+from parkingadvisor import rates
+
+
+TEST_STREET_NAME = '10TH AVE BETWEEN E MADISON ST AND E SENECA ST'
+
+
+def test_loc_period():
+    """
+    Testing the fuction which create the rate of all streets at specific time
+    """
+    # Check the results in 5 different time
+    test_data = pd.DataFrame(data={'UNITDESC': TEST_STREET_NAME,
+                                   'WKD_START1': 8,
+                                   'WKD_START2': 11,
+                                   'WKD_START3':17,
+                                   'WKD_END': 22,
+                                   'WKD_RATE1': 2,
+                                   'WKD_RATE2': 3,
+                                   'WKD_RATE3': 2}, index=[0])
+    # Before morning - free
+    bf_morn = rates._loc_period(test_data, 5)
+    assert bf_morn.RATE.values[0] == 0
+    # Morning
+    morn = rates._loc_period(test_data, 10)
+    assert morn.RATE.values[0] == 2
+    # Afternoon
+    aftn = rates._loc_period(test_data, 16)
+    assert aftn.RATE.values[0] == 3
+    # Evening
+    even = rates._loc_period(test_data, 20)
+    assert even.RATE.values[0] == 2
+    # After Evening
+    even = rates._loc_period(test_data, 23)
+    assert even.RATE.values[0] == 0
+
+    # The given dataframe is not modified
+    assert 'SEC0' not in test_data.columns
+    assert test_data.shape == (1, 8)
+
+
+def test_loc_period_vectorized():
+    """
+    Testing resolving the sections of many streets with different key
+    timepoints at once
+    """
+    test_data = pd.DataFrame(data={'UNITDESC': ['A', 'B', 'C'],
+                                   'START1': [8, 9, np.nan],
+                                   'END1': [11, 11, np.nan],
+                                   'END2': [17, 18, np.nan],
+                                   'END3': [20, np.nan, np.nan],
+                                   'RATE1': [1, 2, np.nan],
+                                   'RATE2': [3, 4, np.nan],
+                                   'RATE3': [5, np.nan, np.nan]})
+    expect = {8: [1, 0, 0], 9: [1, 2, 0], 12: [3, 4, 0], 17: [5, 4, 0],
+              18: [5, 0, 0], 20: [0, 0, 0]}
+    for hour, rate in expect.items():
+        df_rate = rates._loc_period(test_data, hour)
+        assert np.array_equal(df_rate.UNITDESC.values, ['A', 'B', 'C'])
+        assert np.array_equal(df_rate.RATE.values, rate)
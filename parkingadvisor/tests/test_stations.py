@@ -0,0 +1,42 @@
+"""
+Testing the EV charging stations module
+"""
+
+from parkingadvisor import stations
+
+
+def test_ev_layer():
+    """
+    Testing the EV layer dataframe
+    """
+    assert stations.ev_layer
+
+
+def test_ev_clusters():
+    """
+    Testing the clusters of EV charging stations at low zooms
+    """
+    df_ev = stations.ev_layer()
+    df_clusters = stations.ev_clusters(12)
+
+    assert df_clusters['COUNT'].sum() == len(df_ev)
+    assert len(df_clusters) < stations.ev_clusters(14).shape[0] < len(df_ev)
+    assert len(stations.ev_clusters(stations.EV_ZOOM)) == len(df_ev)
+
+
+def test_EStation():
+    """
+    Testing the class EStation
+    """
+    test = stations.EStation('Array Apartments')
+    assert not hasattr(test, '__dict__')
+    assert test.address == "14027 Lake City Way NE"
+    assert test.phone == "800-663-5633"
+    assert test.code == 98125
+    assert test.NEMA520 == False
+    assert test.J1772 == True
+    assert test.CHADEMO == False
+    assert test.TESLA == False
+    assert test.level1 == False
+    assert test.level2 == True
+    assert test.dc == False
@@ -0,0 +1,89 @@
+"""
+Testing the columnar dataset store
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from parkingadvisor import filter, store, streets
+
+
+def _write_table(path):
+    "Write a small CSV dataset with its index as first column"
+    pd.DataFrame({'UNITDESC': ['PIKE ST', 'PINE ST'], 'RATE': [1.0, 2.5],
+                  'LIMIT': [120, 60]}).to_csv(path)
+
+
+def test_read_table(tmp_path):
+    """
+    Testing reading the original CSV file when there is no columnar copy
+    """
+    path = str(tmp_path / 'rate.csv')
+    _write_table(path)
+
+    df = store.read_table(path)
+    assert list(df.columns) == ['UNITDESC', 'RATE', 'LIMIT']
+    assert list(df.index) == [0, 1]
+
+    df = store.read_table(path, ['UNITDESC', 'RATE'])
+    assert list(df.columns) == ['UNITDESC', 'RATE']
+    assert df['RATE'].tolist() == [1.0, 2.5]
+
+
+def test_read_geo():
+    """
+    Testing reading a GeoJSON layer with a subset of the properties
+    """
+    gdf = store.read_geo(filter.EV_FILE, ['Station Name'])
+
+    assert list(gdf.columns) == ['Station Name', 'geometry']
+    assert len(gdf) == len(filter.ev_layer())
+
+
+def test_convert(tmp_path):
+    """
+    Testing the columnar copy is read instead of the original file
+    """
+    path = str(tmp_path / 'rate.csv')
+    _write_table(path)
+    if not store.has_parquet():
+        with pytest.raises(ImportError):
+            store.convert(path)
+        pytest.skip('pyarrow is not installed')
+
+    parquet = store.convert(path)
+    assert parquet == str(tmp_path / 'build' / 'rate.parquet')
+    pd.testing.assert_frame_equal(store.read_table(path), pd.read_csv(path, index_col=0))
+    assert list(store.read_table(path, ['RATE']).columns) == ['RATE']
+
+    # A copy older than the original file is not used
+    os.utime(parquet, ns=(0, 0))
+    assert store._fresh_copy(path) is None
+
+
+def test_convert_geo(tmp_path):
+    """
+    Testing the street geometry is read from the GeoParquet copy
+    """
+    path = str(tmp_path / 'streets.json')
+    shutil.copy(filter.GIS_FILE, path)
+    names, coords, offsets = streets.read_lines(path)
+    if not store.has_parquet():
+        pytest.skip('pyarrow is not installed')
+
+    parquet = store.convert(path)
+    assert os.listdir(os.path.dirname(parquet)) == ['streets.parquet']
+    # The original file is no longer read
+    with open(path, 'w') as file:
+        file.write('{}')
+    os.utime(parquet)
+
+    copy_names, copy_coords, copy_offsets = streets.read_lines(path)
+    assert np.array_equal(copy_names, names)
+    assert np.array_equal(copy_coords, coords)
+    assert np.array_equal(copy_offsets, offsets)
+    assert streets.read_fragments(path)[0] == names.tolist()
@@ -0,0 +1,118 @@
+"""
+Testing the street reference points
+"""
+
+import json
+
+import numpy as np
+
+from parkingadvisor import streets
+
+
+def _write_streets(path):
+    """
+    Write a GeoJSON file with a straight street and an L-shaped street
+    """
+    features = [
+        {'type': 'Feature', 'properties': {'UNITDESC': 'STRAIGHT ST'},
+         'geometry': {'type': 'LineString',
+                      'coordinates': [[-122.34, 47.60], [-122.32, 47.62]]}},
+        {'type': 'Feature', 'properties': {'UNITDESC': 'L SHAPED AVE'},
+         'geometry': {'type': 'LineString',
+                      'coordinates': [[-122.30, 47.60], [-122.30, 47.61],
+                                      [-122.30, 47.63], [-122.29, 47.63]]}}]
+    with open(path, 'w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
+
+
+def test_read_lines(tmp_path):
+    """
+    Testing reading all lines into a flat coordinate buffer
+    """
+    path = str(tmp_path / 'streets.json')
+    _write_streets(path)
+    names, coords, offsets = streets.read_lines(path)
+
+    assert np.array_equal(names, ['STRAIGHT ST', 'L SHAPED AVE'])
+    assert coords.shape == (6, 2)
+    assert np.array_equal(offsets, [0, 2, 6])
+
+
+def test_build_points(tmp_path):
+    """
+    Testing the midpoint, centroid and bounding box of each street
+    """
+    path = str(tmp_path / 'streets.json')
+    _write_streets(path)
+    points = streets.build_points(path)
+
+    assert points.shape == (2,)
+    # A two-point street is located at the middle of its end points
+    assert np.isclose(points['MID_LAT'][0], 47.61)
+    assert np.isclose(points['MID_LON'][0], -122.33)
+    assert np.isclose(points['CEN_LAT'][0], 47.61)
+
+    # The L-shaped street is located on its long leg, not between its
+    # first two vertices
+    assert np.isclose(points['MID_LON'][1], -122.30)
+    assert 47.61 < points['MID_LAT'][1] < 47.63
+    assert points['CEN_LON'][1] > -122.30
+    assert np.allclose([points['MIN_LAT'][1], points['MIN_LON'][1],
+                        points['MAX_LAT'][1], points['MAX_LON'][1]],
+                       [47.60, -122.30, 47.63, -122.29])
+    assert points['LENGTH'][1] > points['LENGTH'][0] / 2
+
+
+def test_read_fragments(tmp_path):
+    """
+    Testing the pre-serialized geometry of each street
+    """
+    path = str(tmp_path / 'streets.json')
+    _write_streets(path)
+    names, fragments = streets.read_fragments(path)
+
+    assert names == ['STRAIGHT ST', 'L SHAPED AVE']
+    assert json.loads(fragments[0]) == {'type': 'LineString',
+                                        'coordinates': [[-122.34, 47.60], [-122.32, 47.62]]}
+
+
+def test_simplify_lines(tmp_path):
+    """
+    Testing the simplified and rounded lines of a zoom level
+    """
+    path = str(tmp_path / 'streets.json')
+    _write_streets(path)
+    _, coords, offsets = streets.read_lines(path)
+    simple, simple_offsets = streets.simplify_lines(coords, offsets, 0.001, 4)
+
+    # The straight vertex of the L-shaped street is dropped, its corner kept
+    assert np.array_equal(simple_offsets, [0, 2, 5])
+    assert np.allclose(simple[2:], [[-122.30, 47.60], [-122.30, 47.63], [-122.29, 47.63]])
+    assert np.array_equal(simple, np.round(simple, 4))
+
+
+def test_read_parts(tmp_path):
+    """
+    Testing the flat buffers of the lines keep the parts of multi-lines
+    """
+    path = str(tmp_path / 'streets.json')
+    features = [
+        {'type': 'Feature', 'properties': {'UNITDESC': 'STRAIGHT ST'},
+         'geometry': {'type': 'LineString',
+                      'coordinates': [[-122.34, 47.60], [-122.32, 47.62]]}},
+        {'type': 'Feature', 'properties': {'UNITDESC': 'SPLIT AVE'},
+         'geometry': {'type': 'MultiLineString',
+                      'coordinates': [[[-122.30, 47.60], [-122.30, 47.61]],
+                                      [[-122.30, 47.63], [-122.29, 47.63], [-122.28, 47.63]]]}}]
+    with open(path, 'w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
+
+    coords, part_offsets, offsets, multi = streets.read_parts(path)
+    assert coords.shape == (7, 2)
+    assert np.array_equal(part_offsets, [0, 2, 4, 7])
+    assert np.array_equal(offsets, [0, 1, 3])
+    assert np.array_equal(multi, [False, True])
+
+    lines = streets.build_lines(coords, part_offsets, offsets, multi)
+    assert [line.geom_type for line in lines] == ['LineString', 'MultiLineString']
+    assert [len(part.coords) for part in lines[1].geoms] == [2, 3]
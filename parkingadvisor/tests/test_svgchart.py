@@ -0,0 +1,32 @@
+"""
+Testing the SVG occupancy chart
+"""
+
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from parkingadvisor import svgchart
+
+
+def test_flow_svg():
+    """
+    Testing the area, grid and labels of the chart
+    """
+    time = np.linspace(0, 24, 241)
+    svg = svgchart.flow_svg(time, np.full(241, 0.5))
+    root = ET.fromstring(svg)
+    ns = '{http://www.w3.org/2000/svg}'
+
+    labels = [text.text for text in root.iter(ns + 'text')]
+    assert labels == ['8 AM', '12 PM', '4 PM', '8 PM', '12 AM', '0', '50', '100 %']
+    assert len(root.findall(ns + 'line')) == 9
+
+    # Only the points within 8 AM - 12 AM are drawn, at half the height
+    path = root.find(ns + 'path').get('d')
+    points = [tuple(map(float, point.split(','))) for point in path[1:-2].replace('L', '').split()]
+    assert len(points) == 161 + 2
+    assert points[0][0] == svgchart.LEFT and points[-1][0] == svgchart.RIGHT
+    assert np.isclose(points[1][1], (svgchart.TOP + svgchart.BOTTOM) / 2)
+
+    assert ET.fromstring(svgchart.flow_svg([], [])).find(ns + 'path') is None
@@ -0,0 +1,89 @@
+"""
+Testing the vector tiles of street layers
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from parkingadvisor import filter, mvt, tiles
+from parkingadvisor.tests.test_mvt import _read_message
+
+
+TILE = (15, 5249, 11443)  # Downtown Seattle
+
+
+def test_build_tile():
+    """
+    Testing a tile holds the streets crossing it with their values
+    """
+    values = np.arange(1232, dtype=np.float64)
+    tile = _read_message(tiles.build_tile('rate', *TILE, values))
+    layer = _read_message(tile[3][0])
+    ids = [_read_message(feature)[1][0] for feature in layer[2]]
+
+    bounds = filter.streets_in_bounds(mvt.tile_bounds(*TILE))
+    assert layer[1] == [b'rate']
+    assert set(bounds.index) <= set(ids)
+    assert {key.decode() for key in layer[3]} == {'UNITDESC', 'RATE'}
+
+
+def test_street_tile(tmp_path):
+    """
+    Testing tiles are cached on disk by layer and time slot
+    """
+    cache_dir = str(tmp_path)
+    tile = tiles.street_tile('occupancy', *TILE, datetime(2018, 12, 10, 8, 32),
+                             cache_dir=cache_dir)
+    files = [os.path.join(root, name) for root, _, names in os.walk(cache_dir)
+             for name in names]
+    assert len(files) == 1 and files[0].endswith(os.path.join('15', '5249', '11443.mvt'))
+
+    # Same flow slot, served from the disk cache
+    assert tiles.street_tile('occupancy', *TILE, datetime(2018, 12, 11, 8, 31),
+                             cache_dir=cache_dir) == tile
+    assert tile == tiles.street_tile('occupancy', *TILE, datetime(2018, 12, 10, 8, 32),
+                                     cache_dir=None)
+
+    # Recommendation tiles are only cached in memory
+    cache = tiles.RECOMM_TILES
+    cache.clear()
+    recomm = tiles.street_tile('recomm', *TILE, datetime(2018, 12, 10, 8, 32),
+                               dest=(47.6062, -122.3321), cache_dir=cache_dir)
+    assert recomm != tile
+    assert cache.info()['size'] == 1
+    assert len([name for _, _, names in os.walk(cache_dir) for name in names]) == 1
+
+    for z, x, y in [(23, 0, 0), (2, 4, 0), (2, 0, -1)]:
+        with pytest.raises(ValueError):
+            tiles.street_tile('occupancy', z, x, y, cache_dir=cache_dir)
+
+    with pytest.raises(ValueError):
+        tiles.street_tile('recomm', *TILE, cache_dir=cache_dir)
+    with pytest.raises(ValueError):
+        tiles.street_tile('speed', *TILE, cache_dir=cache_dir)
+
+
+def test_street_tile_versions(tmp_path):
+    """
+    Testing the tiles of older dataset versions are removed from the cache
+    """
+    old = tmp_path / 'old' / 'occupancy'
+    old.mkdir(parents=True)
+    (old / 'tile.mvt').write_bytes(b'')
+
+    tiles.street_tile('occupancy', *TILE, datetime(2018, 12, 10, 8, 32),
+                      cache_dir=str(tmp_path))
+    assert os.listdir(str(tmp_path)) == [tiles._tile_version(filter.GIS_FILE)]
+
+
+def test_valid_tile():
+    """
+    Testing tiles outside the grid or too deep are rejected
+    """
+    assert tiles.valid_tile(0, 0, 0) and tiles.valid_tile(*TILE)
+    assert not tiles.valid_tile(tiles.MAX_ZOOM + 1, 0, 0)
+    assert not tiles.valid_tile(3, 8, 0) and not tiles.valid_tile(3, 0, 8)
+    assert not tiles.valid_tile(-1, 0, 0) and not tiles.valid_tile(3, -1, 0)
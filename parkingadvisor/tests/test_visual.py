@@ -41,5 +41,14 @@ def test_MapLayer():
     m.add_layer() #  after
     assert 'RATE' in m.gdf.columns.values
 
+    # The layer can still be replaced by the caller
+    m.gdf = m.gdf.head(3)
+    assert m.gdf.shape[0] == 3
+
     m.add_ev_charger()
     assert 'EV Connector Types' in m.ev.columns.values
+
+    # Clusters are only drawn at a given zoom
+    m = visual.MapLayer(date_time=now, dest=(47.6062, -122.3321), mode=1, zoom=12)
+    assert m.zoom == 12
+    assert 'COUNT' in m.add_ev_charger().ev.columns.values
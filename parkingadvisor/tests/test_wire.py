@@ -0,0 +1,44 @@
+"""
+Testing the compact encoding of layer values
+"""
+
+import numpy as np
+import pytest
+
+from parkingadvisor import wire
+
+
+def test_encode_uint8():
+    """
+    Testing values are quantized to 255 levels with missing values kept
+    """
+    values = np.array([0.5, np.nan, 2.5, 1.0])
+    payload = wire.encode_values(values)
+
+    assert payload['dtype'] == 'uint8'
+    assert (payload['min'], payload['max']) == (0.5, 2.5)
+    decoded = wire.decode_values(payload)
+    assert np.isnan(decoded[1])
+    assert np.allclose(decoded[[0, 2, 3]], [0.5, 2.5, 1.0], atol=2 / 254)
+
+
+def test_encode_float16():
+    """
+    Testing values are sent as half floats
+    """
+    values = np.array([0.25, np.nan, 0.75])
+    decoded = wire.decode_values(wire.encode_values(values, 'float16'))
+
+    assert np.isnan(decoded[1])
+    assert np.array_equal(decoded[[0, 2]], [0.25, 0.75])
+
+
+def test_encode_constant():
+    """
+    Testing constant or empty arrays
+    """
+    assert np.array_equal(wire.decode_values(wire.encode_values([3.0, 3.0])), [3, 3])
+    assert wire.decode_values(wire.encode_values([])).shape == (0,)
+
+    with pytest.raises(ValueError):
+        wire.encode_values([1.0], 'int32')
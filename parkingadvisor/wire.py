@@ -0,0 +1,73 @@
+"""
+This module encodes the values of a map layer as compact typed arrays,
+so the browser only receives the geometry once and then one small array
+per layer update.
+
+A payload is a JSON-serializable dict:
+
+    'dtype' -- 'uint8' (quantized to 255 levels) or 'float16'
+    'min', 'max' -- The range of the values, to restore quantized values
+    'data' -- The base64 text of the little-endian array
+
+For 'uint8', value = min + q / 254 * (max - min) and q = 255 is missing.
+"""
+
+import base64
+
+import numpy as np
+
+
+DTYPES = ('uint8', 'float16')
+MISSING = 255
+_LEVELS = 254
+
+
+def encode_values(values, dtype='uint8'):
+    """
+    Encode an array of values as a compact payload
+
+    :param values: The values, NaN for missing
+    :type values: array
+
+    :param dtype: 'uint8' (quantized) or 'float16'
+    :type dtype: str
+
+    :returns: The payload
+    :rtype: dict
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    v_min = float(values[valid].min()) if valid.any() else 0.0
+    v_max = float(values[valid].max()) if valid.any() else 0.0
+
+    if dtype == 'uint8':
+        scale = _LEVELS / (v_max - v_min) if v_max > v_min else 0.0
+        data = np.full(values.shape, MISSING, dtype=np.uint8)
+        data[valid] = np.rint((values[valid] - v_min) * scale)
+    elif dtype == 'float16':
+        data = values.astype('<f2')
+    else:
+        raise ValueError("Unknown payload dtype '{}', expected one of {}".format(dtype, DTYPES))
+
+    return {'dtype': dtype, 'min': v_min, 'max': v_max,
+            'data': base64.b64encode(data.tobytes()).decode('ascii')}
+
+
+def decode_values(payload):
+    """
+    Decode a payload created by `encode_values`
+
+    :param payload: The payload
+    :type payload: dict
+
+    :returns: The values, NaN for missing
+    :rtype: float64 array
+    """
+    raw = base64.b64decode(payload['data'])
+    if payload['dtype'] == 'float16':
+        return np.frombuffer(raw, dtype='<f2').astype(np.float64)
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+    values = payload['min'] + data / _LEVELS * (payload['max'] - payload['min'])
+
+    return np.where(data == MISSING, np.nan, values)
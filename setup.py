@@ -51,7 +51,13 @@ setup(
     DEALINGS IN THE SOFTWARE.
     ''',
     url = 'https://github.com/deepforce/parkingadvisor',
-    install_requires = ['folium', 'geopandas', 'pandas', 'numpy'],
+    # Shapely 2 for the vectorized geometry functions, importlib.resources.files
+    # for the package data
+    python_requires = '>=3.9',
+    install_requires = ['folium', 'geopandas>=0.12,<1.0', 'pandas>=1.1', 'numpy>=1.20',
+                        'scipy', 'shapely>=2.0'],
+    # Columnar copies of the datasets, see `parkingadvisor.store`
+    extras_require = {'parquet': ['pyarrow>=8']},
     # metadata for upload to PyPI
     keywords = "active Seattle parking map "
     )
\ No newline at end of file